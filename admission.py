@@ -0,0 +1,175 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from ml_engine.conversations import ANONYMOUS_SENDERS
+
+# --- ADMISSION LIMITS ---
+# Token buckets: sustained requests/second and burst size. rate <= 0 disables.
+KEY_RATE = float(os.getenv("HONEYPOT_RATE_PER_KEY", "200"))
+KEY_BURST = float(os.getenv("HONEYPOT_BURST_PER_KEY", "400"))
+SENDER_RATE = float(os.getenv("HONEYPOT_RATE_PER_SENDER", "1"))
+SENDER_BURST = float(os.getenv("HONEYPOT_BURST_PER_SENDER", "5"))
+# Buckets kept in memory per limiter; least recently used beyond this are dropped
+MAX_TRACKED = int(os.getenv("HONEYPOT_RATE_MAX_TRACKED", "100000"))
+# Watchdog: above DEGRADE_INFLIGHT engaged requests skip the LLM, above
+# MAX_INFLIGHT (or MAX_CPU_QUEUE jobs waiting for the CPU pool) they get a 429
+DEGRADE_INFLIGHT = int(os.getenv("HONEYPOT_DEGRADE_INFLIGHT", "256"))
+MAX_INFLIGHT = int(os.getenv("HONEYPOT_MAX_INFLIGHT", "1024"))
+MAX_CPU_QUEUE = int(os.getenv("HONEYPOT_MAX_CPU_QUEUE", "2048"))
+# What a single /honeypot/engage from an over-limit sender gets: "degrade" or "reject"
+SENDER_POLICY = os.getenv("HONEYPOT_SENDER_OVERLIMIT", "degrade")
+RETRY_AFTER_SECONDS = int(os.getenv("HONEYPOT_RETRY_AFTER", "1"))
+
+
+class TokenBucketLimiter:
+    """
+    One token bucket per key, refilled lazily on access. Buckets live in an
+    LRU capped at max_keys, so memory stays bounded however many keys show up;
+    a dropped key simply starts again with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = MAX_TRACKED):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill_locked(self, key: str, now: float) -> list:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [self.burst, now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        return bucket
+
+    def allow(self, key: str, cost: float = 1.0) -> bool:
+        """
+        Takes `cost` tokens if the bucket has them. A cost above the burst can
+        never be covered, so it is admitted on a full bucket and charged in
+        full: the bucket goes into debt and the key is refused until the rate
+        has paid it back. Large requests get through without beating the rate.
+        """
+        if not self.enabled:
+            return True
+        with self._lock:
+            bucket = self._refill_locked(key, time.monotonic())
+            if bucket[0] < min(cost, self.burst):
+                return False
+            bucket[0] -= cost
+            return True
+
+    def reserve(self, key: str, cost: float = 1.0) -> float:
+        """
+        Always takes `cost` tokens, going into debt if needed, and returns how
+        many seconds the caller should wait before doing the work (0 if the
+        tokens were there). For work that can be paced, not refused.
+        """
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            bucket = self._refill_locked(key, time.monotonic())
+            bucket[0] -= cost
+            return -bucket[0] / self.rate if bucket[0] < 0 else 0.0
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class AdmissionController:
+    """
+    Decides, before any scoring work, whether a request is admitted, served
+    degraded (detection only, no LLM) or shed with a 429.
+    """
+
+    def __init__(self):
+        self.keys = TokenBucketLimiter(KEY_RATE, KEY_BURST)
+        self.senders = TokenBucketLimiter(SENDER_RATE, SENDER_BURST)
+        # Engage requests currently being processed (event-loop only)
+        self.inflight = 0
+        # Jobs handed to the CPU pool and not finished yet, queued or running (event-loop only)
+        self.cpu_jobs = 0
+        # (decision, reason) -> count
+        self.decisions = {}
+
+    def _count(self, decision: str, reason: str):
+        key = (decision, reason)
+        self.decisions[key] = self.decisions.get(key, 0) + 1
+
+    def admit(self, api_key: str, cost: int = 1, queue_depth: int = 0):
+        """
+        Returns None if the request may proceed, else the reason to shed it.
+        """
+        reason = None
+        if self.inflight >= MAX_INFLIGHT:
+            reason = "inflight"
+        elif queue_depth >= MAX_CPU_QUEUE:
+            reason = "cpu_queue"
+        elif not self.keys.allow(api_key, cost):
+            reason = "key_rate"
+        self._count("reject" if reason else "admit", reason or "ok")
+        return reason
+
+    def pace(self, api_key: str, cost: int) -> float:
+        """
+        Charges an already admitted stream for `cost` more items; returns the
+        seconds to wait before scoring them.
+        """
+        delay = self.keys.reserve(api_key, cost)
+        if delay:
+            self._count("throttle", "key_rate")
+        return delay
+
+    def sender_decision(self, sender_id: str, policy: str = "degrade"):
+        """
+        (decision, reason) for one engaged message: decision is "admit",
+        "degrade" or "reject" (only with policy="reject").
+        """
+        if sender_id not in ANONYMOUS_SENDERS and not self.senders.allow(sender_id):
+            decision, reason = ("reject" if policy == "reject" else "degrade"), "sender_rate"
+        elif self.inflight >= DEGRADE_INFLIGHT:
+            decision, reason = "degrade", "inflight"
+        else:
+            return "admit", None
+        self._count(decision, reason)
+        return decision, reason
+
+    def enter(self):
+        self.inflight += 1
+
+    def leave(self):
+        self.inflight -= 1
+
+    def cpu_submitted(self, future):
+        """
+        Counts an asyncio future wrapping a CPU-pool job until it completes.
+        The done-callback runs on the loop too, so no lock is needed.
+        """
+        self.cpu_jobs += 1
+        future.add_done_callback(self._cpu_finished)
+
+    def _cpu_finished(self, future):
+        self.cpu_jobs -= 1
+
+    def stats(self) -> dict:
+        return {
+            "inflight": self.inflight,
+            "cpu_jobs": self.cpu_jobs,
+            "tracked_keys": len(self.keys),
+            "tracked_senders": len(self.senders),
+            "decisions": {f"{decision}:{reason}": n for (decision, reason), n in self.decisions.items()},
+        }
+
+
+admission = AdmissionController()
@@ -0,0 +1,332 @@
+"""
+Read side for dashboards: keyset-paginated run listings, indicator lookups
+and rollup-backed headline counts over honeypot_runs.
+
+The derived tables (honeypot_run_indicators, honeypot_run_rollups) are kept
+up to date by the write-behind flusher in the same transaction as the runs.
+Rows stored before they existed (and indexes missing on an existing
+honeypot_runs table) can be backfilled with:
+
+    python -m analytics backfill
+"""
+import sys
+import base64
+import datetime
+from collections import defaultdict
+
+from sqlalchemy import and_, func, select, text, tuple_
+
+from ml_engine.blocklist import normalize_indicator
+from models import PARTITION_RUNS, HoneypotRun, RunIndicator, RunRollup
+
+MAX_PAGE_SIZE = 500
+# Run-row JSON column -> indicator kind
+INDICATOR_COLUMNS = {
+    "extracted_upi": "upi",
+    "extracted_phones": "phone",
+    "extracted_links": "host",
+    "extracted_accounts": "account",
+}
+INDICATOR_KINDS = tuple(INDICATOR_COLUMNS.values())
+
+
+def normalize(kind: str, value: str):
+    # Same canonical forms as the blocklist; accounts are just their digits
+    if kind == "account":
+        return "".join(ch for ch in value if ch.isdigit()) or None
+    return normalize_indicator(kind, value)
+
+
+# --- WRITE SIDE (called by persistence.RunWriter) ---
+def _dialect_insert(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Rollup upserts are not implemented for {dialect}")
+    return insert
+
+
+def _hour(timestamp: datetime.datetime) -> datetime.datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def _ceil_hour(timestamp: datetime.datetime) -> datetime.datetime:
+    hour = _hour(timestamp)
+    return hour if hour == timestamp else hour + datetime.timedelta(hours=1)
+
+
+def indicator_rows(rows: list) -> list:
+    out = {}
+    for row in rows:
+        for column, kind in INDICATOR_COLUMNS.items():
+            for raw in row.get(column) or ():
+                value = normalize(kind, raw)
+                if value:
+                    out[(kind, value, row["id"])] = row["timestamp"]
+    return [
+        {"kind": kind, "value": value, "run_id": run_id, "timestamp": timestamp}
+        for (kind, value, run_id), timestamp in out.items()
+    ]
+
+
+def rollup_rows(rows: list) -> list:
+    buckets = defaultdict(lambda: [0, 0.0])
+    for row in rows:
+        key = (_hour(row["timestamp"]), bool(row["is_scam"]), row["scam_type"] or "")
+        buckets[key][0] += 1
+        buckets[key][1] += row["confidence"] or 0.0
+    return [
+        {"bucket": bucket, "is_scam": is_scam, "scam_type": scam_type, "runs": runs, "confidence_sum": confidence_sum}
+        for (bucket, is_scam, scam_type), (runs, confidence_sum) in buckets.items()
+    ]
+
+
+def insert_runs(db, rows: list) -> list:
+    """
+    Inserts run rows, skipping ids that are already stored. Returns the rows
+    actually inserted; a duplicate never fails the rest of the batch.
+    """
+    insert = _dialect_insert(db.get_bind().dialect.name)
+    result = db.execute(insert(HoneypotRun).on_conflict_do_nothing().returning(HoneypotRun.id), rows)
+    inserted = set(result.scalars())
+    kept = []
+    for row in rows:
+        # A repeated id inside the batch was only inserted once: keep its first row
+        if row["id"] in inserted:
+            inserted.discard(row["id"])
+            kept.append(row)
+    return kept
+
+
+def write_derived(db, rows: list):
+    """
+    Indicator rows and rollup increments for a batch of freshly inserted runs.
+    """
+    insert = _dialect_insert(db.get_bind().dialect.name)
+    indicators = indicator_rows(rows)
+    if indicators:
+        db.execute(insert(RunIndicator).on_conflict_do_nothing(), indicators)
+    rollups = rollup_rows(rows)
+    if rollups:
+        stmt = insert(RunRollup)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["bucket", "is_scam", "scam_type"],
+                set_={
+                    "runs": RunRollup.runs + stmt.excluded.runs,
+                    "confidence_sum": RunRollup.confidence_sum + stmt.excluded.confidence_sum,
+                },
+            ),
+            rollups,
+        )
+
+
+_partitions_ready = set()
+
+
+def ensure_partitions(engine, months_ahead: int = 2):
+    """
+    Creates monthly partitions of honeypot_runs (this month and the next
+    `months_ahead`) plus a DEFAULT catch-all. No-op unless HONEYPOT_PARTITION_RUNS=1
+    on PostgreSQL; cheap to call on every flush.
+    """
+    if not PARTITION_RUNS or engine.dialect.name != "postgresql":
+        return
+    today = datetime.date.today()
+    month = datetime.date(today.year, today.month, 1)
+    if month in _partitions_ready:
+        return
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS honeypot_runs_default PARTITION OF honeypot_runs DEFAULT"))
+        start = month
+        for _ in range(months_ahead + 1):
+            end = datetime.date(start.year + start.month // 12, start.month % 12 + 1, 1)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS honeypot_runs_{start:%Y%m} PARTITION OF honeypot_runs "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+            start = end
+    _partitions_ready.add(month)
+
+
+# --- CURSORS ---
+def encode_cursor(timestamp: datetime.datetime, key: str) -> str:
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{key}".encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    timestamp, _, key = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").partition("|")
+    return datetime.datetime.fromisoformat(timestamp), key
+
+
+def _run_dict(run) -> dict:
+    return {
+        "honeypot_id": run.id,
+        "timestamp_utc": run.timestamp.isoformat() if run.timestamp else None,
+        "input_message": run.input_message,
+        "is_scam": run.is_scam,
+        "scam_type": run.scam_type,
+        "confidence": run.confidence,
+        "campaign_id": run.campaign_id,
+        "upi_ids": run.extracted_upi or [],
+        "phishing_links": run.extracted_links or [],
+        "bank_accounts": run.extracted_accounts or [],
+        "phone_numbers": run.extracted_phones or [],
+        "messages_exchanged": run.messages_exchanged,
+        "duration_seconds": run.duration_seconds,
+    }
+
+
+# --- QUERIES ---
+def list_runs(db, since=None, until=None, is_scam=None, scam_type=None, limit: int = 100, cursor: str = None) -> dict:
+    """
+    Newest first, keyset-paginated on (timestamp, id): each page is an index
+    range scan on ix_honeypot_runs_ts_scam_type, however deep the page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = select(HoneypotRun)
+    if since is not None:
+        query = query.where(HoneypotRun.timestamp >= since)
+    if until is not None:
+        query = query.where(HoneypotRun.timestamp < until)
+    if is_scam is not None:
+        query = query.where(HoneypotRun.is_scam.is_(is_scam))
+    if scam_type:
+        query = query.where(HoneypotRun.scam_type == scam_type)
+    if cursor:
+        timestamp, run_id = decode_cursor(cursor)
+        query = query.where(tuple_(HoneypotRun.timestamp, HoneypotRun.id) < tuple_(timestamp, run_id))
+    runs = db.scalars(
+        query.order_by(HoneypotRun.timestamp.desc(), HoneypotRun.id.desc()).limit(limit + 1)
+    ).all()
+    page = runs[:limit]
+    return {
+        "runs": [_run_dict(run) for run in page],
+        "next_cursor": encode_cursor(page[-1].timestamp, page[-1].id) if len(runs) > limit else None,
+    }
+
+
+def runs_for_indicator(db, kind: str, value: str, limit: int = 100, cursor: str = None) -> dict:
+    """
+    Runs that mentioned one indicator, newest first: a range scan on
+    ix_honeypot_run_indicators_lookup, then a primary-key join per hit.
+    """
+    normalized = normalize(kind, value)
+    if not normalized:
+        return {"kind": kind, "value": value, "runs": [], "next_cursor": None}
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = (
+        select(HoneypotRun, RunIndicator.timestamp)
+        .join(RunIndicator, and_(
+            RunIndicator.run_id == HoneypotRun.id,
+            # Lets PostgreSQL prune partitions when honeypot_runs is partitioned
+            RunIndicator.timestamp == HoneypotRun.timestamp,
+        ))
+        .where(RunIndicator.kind == kind, RunIndicator.value == normalized)
+    )
+    if cursor:
+        timestamp, run_id = decode_cursor(cursor)
+        query = query.where(tuple_(RunIndicator.timestamp, RunIndicator.run_id) < tuple_(timestamp, run_id))
+    rows = db.execute(
+        query.order_by(RunIndicator.timestamp.desc(), RunIndicator.run_id.desc()).limit(limit + 1)
+    ).all()
+    page = rows[:limit]
+    return {
+        "kind": kind,
+        "value": normalized,
+        "runs": [_run_dict(run) for run, _ in page],
+        "next_cursor": encode_cursor(page[-1][1], page[-1][0].id) if len(rows) > limit else None,
+    }
+
+
+def summary(db, since=None, until=None, hourly: bool = False) -> dict:
+    """
+    Headline counts from honeypot_run_rollups (hourly buckets), never from the
+    runs table. Only whole hours can be counted: `since` is rounded down and
+    `until` up, so a partial hour at either end counts in full. The window
+    actually covered is returned as "since"/"until".
+    """
+    filters = []
+    if since is not None:
+        since = _hour(since)
+        filters.append(RunRollup.bucket >= since)
+    if until is not None:
+        until = _ceil_hour(until)
+        filters.append(RunRollup.bucket < until)
+    rows = db.execute(
+        select(RunRollup.scam_type, RunRollup.is_scam, func.sum(RunRollup.runs), func.sum(RunRollup.confidence_sum))
+        .where(*filters)
+        .group_by(RunRollup.scam_type, RunRollup.is_scam)
+    ).all()
+    by_type = {}
+    total = scams = 0
+    for scam_type, is_scam, runs, confidence_sum in rows:
+        runs = int(runs or 0)
+        total += runs
+        scams += runs if is_scam else 0
+        entry = by_type.setdefault(scam_type, {"runs": 0, "avg_confidence": 0.0, "_confidence": 0.0})
+        entry["runs"] += runs
+        entry["_confidence"] += confidence_sum or 0.0
+    for entry in by_type.values():
+        entry["avg_confidence"] = round(entry.pop("_confidence") / entry["runs"], 4) if entry["runs"] else 0.0
+    result = {
+        "since": since.isoformat() if since else None,
+        "until": until.isoformat() if until else None,
+        "total_runs": total,
+        "scam_runs": scams,
+        "by_scam_type": by_type,
+    }
+    if hourly:
+        series = db.execute(
+            select(RunRollup.bucket, func.sum(RunRollup.runs))
+            .where(*filters, RunRollup.is_scam.is_(True))
+            .group_by(RunRollup.bucket)
+            .order_by(RunRollup.bucket)
+        ).all()
+        result["hourly_scam_runs"] = [{"bucket": bucket.isoformat(), "runs": int(runs)} for bucket, runs in series]
+    return result
+
+
+# --- BACKFILL ---
+def backfill(batch_size: int = 5000) -> int:
+    """
+    Rebuilds indicator rows and rollups from the runs table (keyset scan).
+    Rollups are recomputed from scratch, so run it before writers start or
+    on a quiet table.
+    """
+    from database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    # create_all skips indexes on tables that already existed
+    for index in HoneypotRun.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    with SessionLocal() as db:
+        db.query(RunRollup).delete()
+        db.commit()
+    done, after = 0, None
+    while True:
+        with SessionLocal() as db:
+            query = select(HoneypotRun).order_by(HoneypotRun.timestamp, HoneypotRun.id).limit(batch_size)
+            if after:
+                query = query.where(tuple_(HoneypotRun.timestamp, HoneypotRun.id) > tuple_(*after))
+            runs = db.scalars(query).all()
+            if not runs:
+                return done
+            rows = [{
+                "id": run.id, "timestamp": run.timestamp, "is_scam": run.is_scam,
+                "scam_type": run.scam_type, "confidence": run.confidence,
+                **{column: getattr(run, column) for column in INDICATOR_COLUMNS},
+            } for run in runs]
+            write_derived(db, rows)
+            db.commit()
+            done += len(rows)
+            after = (runs[-1].timestamp, runs[-1].id)
+            print(f"📊 backfilled {done} runs", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["backfill"]:
+        raise SystemExit("usage: python -m analytics backfill")
+    print(backfill())
@@ -0,0 +1,80 @@
+"""
+Synthetic corpus of Indian-context scam and clean messages.
+
+Deterministic for a given seed so baselines from different commits score
+exactly the same inputs.
+"""
+import random
+
+NAMES = ["Ravi", "Priya", "Anil", "Sunita", "Mohan", "Kavya", "Rahul", "Deepa"]
+BANKS = ["SBI", "HDFC", "ICICI", "Axis", "PNB", "Kotak"]
+UPI_SUFFIXES = ["ybl", "okaxis", "okicici", "paytm", "upi"]
+DOMAINS = ["kyc-update.in", "secure-bank.co", "refund-itr.xyz", "reward-claim.top", "verify-now.info"]
+
+SCAM_TEMPLATES = [
+    "Dear {name}, your {bank} account will be blocked today. Update KYC at {url} immediately.",
+    "URGENT: electricity connection will be disconnected tonight. Pay bill Rs {amount} to {upi} or call {phone}.",
+    "Congratulations {name}! You are the lucky winner of Rs {amount} lottery. Claim prize at {url}",
+    "Your PAN is not linked. Verify now at {url} or your account gets suspended.",
+    "Sir your {bank} KYC is pending, account suspended in 24 hours. Share OTP sent to {phone} to verify.",
+    "Parcel held at customs. Pay Rs {amount} to {upi} to release it. Contact {phone}.",
+    "Income tax refund of Rs {amount} approved for {name}. Verify bank a/c {account} IFSC {ifsc} at {url}",
+    "Hi mom this is my new number, send Rs {amount} urgently to {upi}",
+]
+
+CLEAN_TEMPLATES = [
+    "Hey {name}, are we still meeting for lunch tomorrow?",
+    "Rs {amount} debited from your {bank} account for electricity bill. Thank you.",
+    "Your order has been shipped and will arrive by Friday.",
+    "Can you call me when you reach home? My number is {phone}.",
+    "Meeting moved to 3pm, see you in the conference room.",
+    "Salary credited. Available balance updated in your {bank} app.",
+    "Happy birthday {name}! Have a great year ahead.",
+    "OTP for your login is {otp}. Do not share it with anyone.",
+]
+
+FILLER = [
+    "Please treat this as important.",
+    "This is an automated message.",
+    "Kindly ignore if already done.",
+    "For queries reply to this number.",
+    "Thank you for banking with us.",
+    "Regards, customer care team.",
+]
+
+# Share of short (1x), medium (~4 extra sentences) and long (~40 extra) messages
+LENGTH_MIX = [(0, 0.6), (4, 0.3), (40, 0.1)]
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    return template.format(
+        name=rng.choice(NAMES),
+        bank=rng.choice(BANKS),
+        url=f"http://{rng.choice(DOMAINS)}/{rng.randrange(10**6):06d}",
+        upi=f"{rng.choice(NAMES).lower()}{rng.randrange(1000)}@{rng.choice(UPI_SUFFIXES)}",
+        phone=f"{rng.choice('6789')}{rng.randrange(10**9):09d}",
+        amount=f"{rng.randrange(99, 250000):,}",
+        account=f"{rng.randrange(10**11, 10**12)}",
+        ifsc=f"{rng.choice(BANKS).upper()[:4].ljust(4, 'X')}0{rng.randrange(10**6):06d}",
+        otp=f"{rng.randrange(10**6):06d}",
+    )
+
+
+def generate_corpus(n: int = 1000, scam_ratio: float = 0.5, seed: int = 1337) -> list:
+    """
+    Returns n dicts: {"text", "label", "length_class"}.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        is_scam = rng.random() < scam_ratio
+        text = _fill(rng.choice(SCAM_TEMPLATES if is_scam else CLEAN_TEMPLATES), rng)
+        extra = rng.choices([k for k, _ in LENGTH_MIX], weights=[w for _, w in LENGTH_MIX])[0]
+        if extra:
+            text = " ".join([text] + [rng.choice(FILLER) for _ in range(extra)])
+        corpus.append({
+            "text": text,
+            "label": int(is_scam),
+            "length_class": {0: "short", 4: "medium"}.get(extra, "long"),
+        })
+    return corpus
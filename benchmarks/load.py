@@ -0,0 +1,115 @@
+"""
+End-to-end load driver for /honeypot/engage.
+
+Boots the API under uvicorn in a subprocess, wired to the local stub LLM
+(benchmarks/stub_llm.py) with persistence disabled, then drives it with a
+fixed number of concurrent clients.
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import subprocess
+
+import httpx
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.stub_llm import start_stub
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_KEY = "bench_key"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base_url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("API did not become ready")
+
+
+async def _drive(base_url: str, texts: list, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, headers={"x-api-key": API_KEY}, limits=limits, timeout=30.0) as client:
+        async def worker(offset: int):
+            nonlocal errors
+            i = offset
+            while time.monotonic() < deadline:
+                payload = {"message": texts[i % len(texts)], "sender_id": f"bench_{offset}"}
+                t0 = time.perf_counter()
+                try:
+                    r = await client.post("/honeypot/engage", json=payload)
+                    if r.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - t0)
+                i += concurrency
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(k) for k in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pct = lambda q: round(latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000, 2) if latencies else None
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "latency_ms_p50": pct(0.50),
+        "latency_ms_p90": pct(0.90),
+        "latency_ms_p99": pct(0.99),
+    }
+
+
+def run_load(concurrency: int = 32, duration: float = 15.0, llm_latency: float = 0.2, corpus_size: int = 2000) -> dict:
+    stub, stub_url = start_stub(latency_seconds=llm_latency)
+    port = _free_port()
+    # Admission control off unless the caller sets it: one client reuses one
+    # sender_id, and degraded or shed requests would skew the numbers
+    defaults = {
+        "HONEYPOT_RATE_PER_KEY": "0",
+        "HONEYPOT_RATE_PER_SENDER": "0",
+        "HONEYPOT_DEGRADE_INFLIGHT": str(10 ** 9),
+        "HONEYPOT_MAX_INFLIGHT": str(10 ** 9),
+        "HONEYPOT_MAX_CPU_QUEUE": str(10 ** 9),
+    }
+    # Always pointed at the stub LLM, with persistence off
+    overrides = {
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": stub_url,
+        "HONEYPOT_API_KEY": API_KEY,
+        "HONEYPOT_PERSIST": "0",
+    }
+    env = {**defaults, **os.environ, **overrides}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(base_url)
+        texts = [row["text"] for row in generate_corpus(corpus_size)]
+        result = asyncio.run(_drive(base_url, texts, concurrency, duration))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        stub.shutdown()
+
+    result.update({"concurrency": concurrency, "duration_s": duration, "llm_latency_s": llm_latency})
+    return result
@@ -0,0 +1,80 @@
+"""
+Microbenchmarks for the per-request building blocks.
+"""
+import time
+
+from benchmarks.corpus import generate_corpus
+
+# Payload shapes /honeypot/engage actually receives
+PAYLOAD_SHAPES = [
+    lambda text: {"message": text, "sender_id": "bench"},
+    lambda text: {"text": text},
+    lambda text: {"meta": {"x": 1}, "whatever": text},
+    lambda text: text,
+    lambda text: ["", text],
+]
+
+
+def bench(fn, inputs, min_seconds: float = 1.0, min_calls: int = 200) -> dict:
+    """
+    Calls fn over inputs (cycling) for at least min_seconds and min_calls.
+    """
+    timings = []
+    n = len(inputs)
+    started = time.perf_counter()
+    i = 0
+    while i < min_calls or time.perf_counter() - started < min_seconds:
+        arg = inputs[i % n]
+        t0 = time.perf_counter_ns()
+        fn(arg)
+        timings.append(time.perf_counter_ns() - t0)
+        i += 1
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        "calls": len(timings),
+        "ops_per_sec": round(len(timings) / elapsed, 1),
+        "mean_us": round(sum(timings) / len(timings) / 1000, 2),
+        "p50_us": round(timings[len(timings) // 2] / 1000, 2),
+        "p99_us": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))] / 1000, 2),
+    }
+
+
+def run_micro(corpus_size: int = 500, min_seconds: float = 1.0) -> dict:
+    from ml_engine.detector import detector
+    from ml_engine.extractor import extractor
+    from ml_engine.agent import agent
+    from schemas import MessageInput
+
+    texts = [row["text"] for row in generate_corpus(corpus_size)]
+    detector.load()
+    results = {}
+
+    # Detector without the verdict cache: the real model cost
+    saved_size = detector.cache.max_size
+    detector.cache.max_size = 0
+    try:
+        results["detector.predict[cold]"] = bench(detector.predict, texts, min_seconds)
+        batches = [texts[i:i + 100] for i in range(0, len(texts), 100)]
+        batch = bench(detector.predict_batch, batches, min_seconds, min_calls=5)
+        batch["msgs_per_sec"] = round(batch["ops_per_sec"] * 100, 1)
+        results["detector.predict_batch[100]"] = batch
+    finally:
+        detector.cache.max_size = saved_size
+
+    detector.cache.clear()
+    for text in texts:
+        detector.predict(text)
+    results["detector.predict[warm_cache]"] = bench(detector.predict, texts, min_seconds)
+
+    results["extractor.extract"] = bench(extractor.extract, texts, min_seconds)
+    results["agent._fallback_response"] = bench(agent._fallback_response, texts, min_seconds)
+
+    payloads = [shape(text) for text in texts[:100] for shape in PAYLOAD_SHAPES]
+    # unify_input mutates dicts in place, so hand every call a fresh copy
+    results["MessageInput.unify_input"] = bench(
+        lambda p: MessageInput.model_validate(dict(p) if isinstance(p, dict) else p),
+        payloads,
+        min_seconds,
+    )
+    return results
@@ -0,0 +1,98 @@
+"""
+Benchmark runner. Stores results as JSON baselines and compares them.
+
+    python -m benchmarks.run                       # micro only, saved as results/<git sha>.json
+    python -m benchmarks.run --load --name before  # micro + end-to-end
+    python -m benchmarks.run --compare benchmarks/results/before.json
+"""
+import os
+import sys
+import json
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Metrics where a bigger number is better; everything else numeric is a latency
+HIGHER_IS_BETTER = ("ops_per_sec", "msgs_per_sec", "rps")
+SKIP_KEYS = ("calls", "requests", "errors", "concurrency", "duration_s", "llm_latency_s")
+
+
+def _git_sha() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(old: dict, new: dict, threshold: float) -> list:
+    """
+    Returns (benchmark, metric, old, new, change, regressed) rows.
+    """
+    rows = []
+    for section in ("micro", "load"):
+        for bench_name, new_metrics in (new.get(section) or {}).items():
+            old_metrics = (old.get(section) or {}).get(bench_name)
+            if not old_metrics:
+                continue
+            for metric, new_value in new_metrics.items():
+                old_value = old_metrics.get(metric)
+                if metric in SKIP_KEYS or not isinstance(new_value, (int, float)) or not old_value:
+                    continue
+                change = (new_value - old_value) / old_value
+                worse = -change if metric in HIGHER_IS_BETTER else change
+                rows.append((bench_name, metric, old_value, new_value, change, worse > threshold))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Honeypot pipeline benchmarks")
+    parser.add_argument("--load", action="store_true", help="also run the end-to-end load test")
+    parser.add_argument("--no-micro", action="store_true", help="skip microbenchmarks")
+    parser.add_argument("--name", help="result file name (default: git sha)")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="regression tolerance (fraction)")
+    parser.add_argument("--seconds", type=float, default=1.0, help="minimum time per microbenchmark")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    result = {
+        "commit": _git_sha(),
+        "created_utc": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+    if not args.no_micro:
+        from benchmarks.micro import run_micro
+        result["micro"] = run_micro(min_seconds=args.seconds)
+    if args.load:
+        from benchmarks.load import run_load
+        result["load"] = {"engage": run_load(args.concurrency, args.duration, args.llm_latency)}
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"{args.name or result['commit']}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+    print(f"📊 Saved {out_path}")
+
+    if not args.compare:
+        return 0
+    with open(args.compare, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = 0
+    print(f"\nvs {args.compare} (commit {baseline.get('commit')}):")
+    for bench_name, metric, old_value, new_value, change, regressed in compare(baseline, result, args.threshold):
+        regressions += regressed
+        flag = "  ⚠️ REGRESSION" if regressed else ""
+        print(f"  {bench_name:32} {metric:18} {old_value:>12} -> {new_value:>12} ({change:+.1%}){flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Local stand-in for the OpenAI chat completions API.
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 and any
+OPENAI_API_KEY. Replies after a configurable delay so LLM latency can be
+modelled without network access or cost.
+"""
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = "Sir, I am trying, but the app is asking for some code. Which one?"
+
+
+def _make_handler(latency_seconds: float):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            time.sleep(latency_seconds)
+            body = json.dumps({
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": "gpt-3.5-turbo",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": REPLY},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 50, "completion_tokens": 16, "total_tokens": 66},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub(port: int = 0, latency_seconds: float = 0.2):
+    """
+    Starts the stub in a daemon thread. Returns (server, base_url).
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(latency_seconds))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    import sys
+    srv, url = start_stub(int(sys.argv[1]) if len(sys.argv) > 1 else 8900)
+    print(f"Stub LLM listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        srv.shutdown()
@@ -0,0 +1,55 @@
+"""
+Fast request decoding / response encoding for the engage endpoints.
+
+Bodies are parsed once (orjson when installed) and responses are dumped
+straight to JSON bytes by pydantic-core, skipping FastAPI's response_model
+re-validation of objects we just constructed ourselves.
+"""
+import json
+from typing import List
+
+from pydantic import TypeAdapter
+
+from schemas import HoneypotResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+_RESPONSE = TypeAdapter(HoneypotResponse)
+_RESPONSE_LIST = TypeAdapter(List[HoneypotResponse])
+
+
+def loads(raw: bytes):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_body(raw: bytes):
+    """
+    Tolerant body decode: JSON when it parses, otherwise the raw text.
+    """
+    if not raw:
+        return ""
+    try:
+        return loads(raw)
+    except ValueError:
+        return raw.decode("utf-8", errors="replace")
+
+
+def encode_response(response: HoneypotResponse) -> bytes:
+    return _RESPONSE.dump_json(response)
+
+
+def encode_responses(responses: list) -> bytes:
+    return _RESPONSE_LIST.dump_json(responses)
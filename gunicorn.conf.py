@@ -0,0 +1,54 @@
+# Production entry point: gunicorn master + uvicorn workers.
+#   gunicorn -c gunicorn.conf.py main:app
+import gc
+import os
+import sys
+import tempfile
+import subprocess
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app (and load the model) once in the master, then fork.
+# Workers share the model pages copy-on-write instead of each loading a copy.
+preload_app = True
+
+# Metrics live in each worker; with this set, any worker answers a scrape with
+# the totals of all of them (see metrics.py). Must be set before the app import.
+os.environ.setdefault("HONEYPOT_METRICS_DIR", os.path.join(tempfile.gettempdir(), f"honeypot-metrics-{bind.rsplit(':', 1)[1]}"))
+
+
+def when_ready(server):
+    from ml_engine.detector import detector
+
+    try:
+        detector.load()
+    except Exception:
+        # Workers come up unready (503 on /ready) and retry the load per request
+        server.log.exception("Scam model failed to load in master")
+        return
+    # Move everything loaded so far out of the GC's tracked generations so
+    # collections in the workers don't touch (and un-share) those pages.
+    gc.freeze()
+    server.log.info("Scam model preloaded in master")
+
+
+def on_starting(server):
+    # Per-process metric files from a previous run would be summed into this one
+    metrics_dir = os.environ["HONEYPOT_METRICS_DIR"]
+    os.makedirs(metrics_dir, exist_ok=True)
+    for name in os.listdir(metrics_dir):
+        if name.split(".", 1)[0].isdigit() and name.endswith((".json", ".json.tmp")):
+            os.remove(os.path.join(metrics_dir, name))
+
+    # One retrainer per host, outside the workers (HONEYPOT_TRAINER=1)
+    server.trainer = None
+    if os.environ.get("HONEYPOT_TRAINER", "0") == "1":
+        server.trainer = subprocess.Popen([sys.executable, "-m", "ml_engine.trainer"])
+        server.log.info("Background trainer started (pid %s)", server.trainer.pid)
+
+
+def on_exit(server):
+    if getattr(server, "trainer", None) is not None:
+        server.trainer.terminate()
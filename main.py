@@ -1,11 +1,14 @@
 import uvicorn
 import uuid
-import random
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import Union  # Add this import
+from typing import List, Optional
 
-from fastapi import FastAPI, HTTPException, Security, status, Body
+from fastapi import FastAPI, HTTPException, Security, Depends, status, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.security import APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -13,6 +16,23 @@ from fastapi.middleware.cors import CORSMiddleware
 from ml_engine.detector import detector
 from ml_engine.agent import agent
 from ml_engine.extractor import extractor
+from ml_engine.blocklist import blocklist
+from ml_engine.campaigns import campaigns
+from ml_engine.conversations import conversations
+from ml_engine.trainer import record_feedback
+
+# ------------------ PERSISTENCE ------------------
+from persistence import PERSIST_ENABLED, run_row, run_writer
+from database import get_db
+import analytics
+from admission import admission, RETRY_AFTER_SECONDS, SENDER_POLICY
+
+# ------------------ METRICS ------------------
+import metrics
+from metrics import STAGE_LATENCY, VERDICTS, ENGAGE_ERRORS, FEEDBACK_LABELS
+
+# ------------------ WIRE FORMAT ------------------
+from codec import JSON_MEDIA_TYPE, decode_body, dumps, encode_response, encode_responses, loads
 
 # ------------------ SCHEMAS ------------------
 from schemas import (
@@ -21,9 +41,107 @@ from schemas import (
     ScamClassification,
     IntelligenceData,
     EngagementMetrics,
+    FeedbackInput,
 )
 
-app = FastAPI(title="Agentic Honeypot API", version="1.0.9")
+# --- INSTRUMENTATION ---
+STAGE_DECODE = STAGE_LATENCY.labels("decode", "message")
+STAGE_DETECT = STAGE_LATENCY.labels("detect", "message")
+STAGE_EXTRACT = STAGE_LATENCY.labels("extract", "message")
+STAGE_LLM = STAGE_LATENCY.labels("llm", "message")
+STAGE_SERIALIZE = STAGE_LATENCY.labels("serialize", "message")
+STAGE_CLUSTER = STAGE_LATENCY.labels("cluster", "message")
+# Batch and stream paths observe once per batch/chunk, kept apart from per-message latency
+BATCH_DECODE = STAGE_LATENCY.labels("decode", "batch")
+BATCH_DETECT = STAGE_LATENCY.labels("detect", "batch")
+BATCH_EXTRACT = STAGE_LATENCY.labels("extract", "batch")
+BATCH_LLM = STAGE_LATENCY.labels("llm", "batch")
+BATCH_SERIALIZE = STAGE_LATENCY.labels("serialize", "batch")
+
+metrics.VERDICT_CACHE_HIT_RATIO.set_function(lambda: detector.cache.stats()["hit_ratio"])
+metrics.VERDICT_CACHE_SIZE.set_function(lambda: detector.cache.stats()["size"])
+metrics.VERDICT_CACHE_EVENTS.set_function(lambda: {
+    (event,): detector.cache.stats()[event] for event in ("hits", "misses", "evictions", "expirations")
+})
+metrics.LLM_CIRCUIT_OPEN.set_function(lambda: 0 if agent.breaker.state == "closed" else 1)
+metrics.CONVERSATIONS.set_function(lambda: conversations.stats()["conversations"])
+metrics.CONVERSATION_BYTES.set_function(lambda: conversations.bytes)
+metrics.MODEL_GENERATION.set_function(lambda: detector._generation)
+metrics.INFLIGHT.set_function(lambda: admission.inflight)
+metrics.ADMISSION_DECISIONS.set_function(lambda: dict(admission.decisions))
+metrics.CAMPAIGNS.set_function(lambda: campaigns.stats()["campaigns"])
+metrics.BLOCKLIST_SIZE.set_function(lambda: blocklist.size)
+metrics.BLOCKLIST_HITS.set_function(lambda: {(kind,): n for kind, n in blocklist.stats()["hits"].items()})
+metrics.WRITER_BUFFERED.set_function(lambda: run_writer.stats()["buffered"])
+metrics.WRITER_EVENTS.set_function(lambda: {
+    (state,): run_writer.stats()[state] for state in ("enqueued", "written", "spilled", "dropped")
+})
+
+# --- EXECUTION MODEL ---
+# Detection and extraction are CPU-bound; they run on a bounded pool so the
+# event loop stays free for I/O (LLM round-trips, other requests).
+CPU_WORKERS = int(os.getenv("HONEYPOT_CPU_WORKERS", str(min(8, (os.cpu_count() or 1) + 2))))
+cpu_pool = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="honeypot-cpu")
+
+
+# NDJSON streaming: lines scored per chunk, and a cap on a single line's size
+STREAM_CHUNK_LINES = int(os.getenv("HONEYPOT_STREAM_CHUNK", "256"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("HONEYPOT_STREAM_MAX_LINE", str(1024 * 1024)))
+
+
+async def run_cpu(fn, *args):
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(cpu_pool, fn, *args)
+    admission.cpu_submitted(future)
+    return await future
+
+
+def _shed_response(reason: str) -> Response:
+    return Response(
+        content=dumps({"detail": f"Server busy ({reason}), retry later"}),
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        media_type=JSON_MEDIA_TYPE,
+    )
+
+
+def _admit(api_key: str, cost: int = 1):
+    """
+    Load-shedding gate in front of the engage endpoints; returns a 429 response
+    to send back, or None when the request is admitted.
+    """
+    # Jobs beyond one per worker are waiting in the pool's queue
+    reason = admission.admit(api_key, cost, max(0, admission.cpu_jobs - CPU_WORKERS))
+    return _shed_response(reason) if reason else None
+
+
+def _log_model_load(future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"❌ Scam model failed to load: {detector.load_error} (requests will retry the load)")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if PERSIST_ENABLED:
+        run_writer.start()
+    conversations.start()
+    metrics.REGISTRY.start()
+    # Start serving immediately; /ready flips once the model is in memory.
+    # (A no-op when a preloading master already loaded it before forking.)
+    if not detector.is_loaded:
+        asyncio.get_running_loop().run_in_executor(cpu_pool, detector.load).add_done_callback(_log_model_load)
+    asyncio.get_running_loop().run_in_executor(cpu_pool, blocklist.start)
+    detector.start_watcher()
+    yield
+    detector.stop_watcher()
+    blocklist.stop()
+    cpu_pool.shutdown(wait=False, cancel_futures=True)
+    conversations.stop()
+    run_writer.stop()
+    metrics.REGISTRY.stop()
+
+
+app = FastAPI(title="Agentic Honeypot API", version="1.0.9", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -50,109 +168,584 @@ async def get_api_key(api_key: str = Security(api_key_header)):
 def health_check():
     return {"status": "online", "system": "Agentic Honeypot v1"}
 
+@app.get("/ready")
+def readiness_check():
+    # Liveness is "/", readiness means the detector can actually score
+    if not detector.is_loaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Model failed to load: {detector.load_error}" if detector.load_error else "Model loading"
+        )
+    return {"status": "ready"}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/honeypot/stats")
+def runtime_stats(api_key: str = Security(get_api_key)):
+    return {
+        "detector": {"backend": detector.backend.name, "loaded": detector.is_loaded, "version": detector.version,
+                     "load_error": detector.load_error},
+        "verdict_cache": detector.cache.stats(),
+        "blocklist": blocklist.stats(),
+        "campaigns": campaigns.stats(),
+        "llm": agent.stats(),
+        "conversations": conversations.stats(),
+        "admission": admission.stats(),
+        "persistence": run_writer.stats(),
+    }
+
+# --- ANALYSIS ---
+def _known_bad_verdict(hit: dict) -> dict:
+    return {
+        "is_scam": True,
+        "confidence": 1.0,
+        "scam_type": "known_bad_indicator",
+        "matched_indicator": hit,
+    }
+
+
+def _cluster(message: str, prediction: dict, intel: dict, run_id: str):
+    # Only scams are clustered; clean traffic would just churn the LRU
+    if not prediction.get("is_scam"):
+        return None
+    with STAGE_CLUSTER.time():
+        return campaigns.add(message, intel, run_id)
+
+
+def _analyze(message: str, run_id: str):
+    """
+    Extraction first, so a known-bad UPI/phone/host short-circuits the model.
+    Returns (prediction, intel, campaign_id).
+    """
+    with STAGE_EXTRACT.time():
+        intel = extractor.extract(message)
+    prediction = None
+    hit = blocklist.match(intel)
+    if hit:
+        prediction = _known_bad_verdict(hit)
+    else:
+        with STAGE_DETECT.time():
+            prediction = detector.predict(message)
+    return prediction, intel, _cluster(message, prediction, intel, run_id)
+
+
+def _analyze_batch(messages: list, run_ids: list):
+    with BATCH_EXTRACT.time():
+        intels = extractor.extract_many(messages)
+    predictions = [None] * len(messages)
+    unmatched = []
+    for i, intel in enumerate(intels):
+        hit = blocklist.match(intel)
+        if hit:
+            predictions[i] = _known_bad_verdict(hit)
+        else:
+            unmatched.append(i)
+    if unmatched:
+        with BATCH_DETECT.time():
+            verdicts = detector.predict_batch([messages[i] for i in unmatched])
+        for i, verdict in zip(unmatched, verdicts):
+            predictions[i] = verdict
+    campaign_ids = [
+        _cluster(message, prediction, intel, run_id)
+        for message, prediction, intel, run_id in zip(messages, predictions, intels, run_ids)
+    ]
+    return predictions, intels, campaign_ids
+
+
+# --- ANALYST FEEDBACK ---
+@app.post("/honeypot/feedback", status_code=status.HTTP_202_ACCEPTED)
+def submit_feedback(feedback: FeedbackInput, api_key: str = Security(get_api_key)):
+    """
+    Queues an analyst label for the background trainer (python -m ml_engine.trainer).
+    """
+    if not feedback.message.strip():
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Empty message")
+    record_feedback(feedback.message, int(feedback.is_scam), feedback.honeypot_id)
+    FEEDBACK_LABELS.labels(str(feedback.is_scam).lower()).inc()
+    return {"status": "accepted", "model_version": detector.version}
+
+
+# --- ANALYTICS ---
+def _naive_utc(value: Optional[datetime]):
+    # honeypot_runs stores naive UTC timestamps
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _bad_cursor():
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+@app.get("/analytics/runs")
+def analytics_runs(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    is_scam: Optional[bool] = None,
+    scam_type: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db=Depends(get_db),
+    api_key: str = Security(get_api_key),
+):
+    """
+    Stored runs, newest first. Pass next_cursor back as ?cursor= for the next page.
+    """
+    try:
+        return analytics.list_runs(db, _naive_utc(since), _naive_utc(until), is_scam, scam_type, limit, cursor)
+    except ValueError:
+        raise _bad_cursor()
+
+
+@app.get("/analytics/indicators/{kind}/{value:path}")
+def analytics_indicator_runs(
+    kind: str,
+    value: str,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db=Depends(get_db),
+    api_key: str = Security(get_api_key),
+):
+    """
+    Runs that mentioned one UPI handle / phone / host / account.
+    """
+    if kind not in analytics.INDICATOR_KINDS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown indicator kind, expected one of: {', '.join(analytics.INDICATOR_KINDS)}",
+        )
+    try:
+        return analytics.runs_for_indicator(db, kind, value, limit, cursor)
+    except ValueError:
+        raise _bad_cursor()
+
+
+@app.get("/analytics/summary")
+def analytics_summary(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    hourly: bool = False,
+    db=Depends(get_db),
+    api_key: str = Security(get_api_key),
+):
+    """
+    Headline counts per scam type, served from the hourly rollups. The window
+    is widened to whole hours (since rounded down, until up).
+    """
+    return analytics.summary(db, _naive_utc(since), _naive_utc(until), hourly)
+
+
+# --- CAMPAIGN QUERIES ---
+@app.get("/campaigns")
+def list_campaigns(limit: int = 50, api_key: str = Security(get_api_key)):
+    """
+    Largest campaigns currently held in memory, with their linked indicators.
+    """
+    return {"campaigns": campaigns.top(max(1, min(limit, 500)))}
+
+
+@app.get("/campaigns/{campaign_id}")
+def get_campaign(campaign_id: str, api_key: str = Security(get_api_key)):
+    campaign = campaigns.get(campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown or evicted campaign")
+    return campaign
+
+
+# --- RESPONSE BUILDERS ---
+def _coerce_input(input_data):
+    """
+    Turns whatever the client sent into (message, sender_id).
+    """
+    message = ""
+    sender_id = "unknown"
+
+    if isinstance(input_data, str):
+        message = input_data if input_data.strip() else "Automated honeypot probe"
+    elif isinstance(input_data, (dict, list)):
+        # One validation pass; unify_input finds the text field
+        msg_input = MessageInput.model_validate(input_data)
+        message = msg_input.message or "Automated honeypot probe"
+        sender_id = msg_input.sender_id
+    elif isinstance(input_data, MessageInput):
+        message = input_data.message or "Automated honeypot probe"
+        sender_id = input_data.sender_id
+    else:
+        # Try to convert to string
+        message = str(input_data)
+
+    return message, sender_id
+
+
+async def _converse(message: str, sender_id: str):
+    """
+    One engaged turn: reply as the sender's persona with their trimmed history,
+    then record both sides. Returns (ai_response, engagement metrics or None).
+    """
+    if conversations.spills:
+        # Restoring a parked conversation reads SQLite; keep it off the loop
+        persona, history = await run_cpu(conversations.context, sender_id)
+    else:
+        persona, history = conversations.context(sender_id)
+    ai_response = await agent.agenerate_response(message, history, persona)
+    return ai_response, conversations.record(sender_id, message, ai_response)
+
+
+def _build_response(
+    run_id, start_time, message, sender_id, prediction, ai_response, intel, campaign_id=None, engagement=None, degraded=None
+):
+    VERDICTS.labels(prediction["scam_type"], str(prediction["is_scam"]).lower()).inc()
+    return HoneypotResponse(
+        honeypot_id=run_id,
+        timestamp_utc=start_time.isoformat(),
+        input_message=message,
+        classification=ScamClassification(
+            is_scam=prediction["is_scam"],
+            scam_type=prediction["scam_type"],
+            confidence=prediction["confidence"],
+            risk_level="critical" if prediction["is_scam"] else "low",
+        ),
+        intelligence=IntelligenceData(
+            bank_accounts=intel.get("bank_accounts", []),
+            upi_ids=intel.get("upi_ids", []),
+            phishing_links=intel.get("phishing_links", []),
+            phone_numbers=intel.get("phone_numbers", []),
+        ),
+        engagement=EngagementMetrics(
+            messages_exchanged=engagement["messages_exchanged"] if engagement else 1,
+            duration_seconds=engagement["duration_seconds"] if engagement else 0,
+            personas_tried=engagement["personas_tried"] if engagement else int(bool(ai_response)),
+        ),
+        campaign_id=campaign_id,
+        metadata={
+            "generated_response": ai_response or "No engagement",
+            "sender_id": sender_id,  # Use the extracted sender_id
+            "http_method": "POST",
+            "model_version": detector.version,
+            **({"persona": engagement["persona"]} if engagement else {}),
+            **({"matched_indicator": prediction["matched_indicator"]} if "matched_indicator" in prediction else {}),
+            **({"degraded": degraded} if degraded else {}),
+        },
+    )
+
+
+def _new_run_id() -> str:
+    # Primary key of honeypot_runs: the full 128 bits, so ids never collide
+    return f"hp_{uuid.uuid4().hex}"
+
+
+def _persist(response):
+    # Write-behind: only enqueues, never waits on the database
+    if PERSIST_ENABLED:
+        run_writer.submit(run_row(response))
+    return response
+
+
+def _error_response(e, input_data):
+    # Enhanced error response
+    ENGAGE_ERRORS.inc()
+    error_id = f"err_{uuid.uuid4().hex[:4]}"
+    print(f"Error {error_id}: {str(e)}")
+    print(f"Input received: {input_data}")
+
+    # Return a proper HoneypotResponse object instead of dict
+    return HoneypotResponse(
+        honeypot_id=error_id,
+        timestamp_utc=datetime.now(timezone.utc).isoformat(),
+        input_message="error_fallback",
+        classification=ScamClassification(
+            is_scam=False,
+            scam_type="none",
+            confidence=0.0,
+            risk_level="low"
+        ),
+        intelligence=IntelligenceData(
+            bank_accounts=[],
+            upi_ids=[],
+            phishing_links=[],
+            phone_numbers=[]
+        ),
+        engagement=EngagementMetrics(
+            messages_exchanged=0,
+            duration_seconds=0,
+            personas_tried=0
+        ),
+        metadata={
+            "error": str(e),
+            "error_type": type(e).__name__,
+            "input_received": str(input_data)[:200] if input_data else "No input"
+        }
+    )
+
+
+# The body is read raw and parsed once (see codec.py); this keeps the
+# tolerant input contract documented in OpenAPI.
+_ENGAGE_BODY_DOC = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {"anyOf": [MessageInput.model_json_schema(), {"type": "object"}, {"type": "string"}]}},
+            "text/plain": {"schema": {"type": "string"}},
+        },
+    }
+}
+_BATCH_BODY_DOC = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {"type": "array", "items": {}}}},
+    }
+}
+
+
 # --- MAIN ENDPOINT ---
-@app.post("/honeypot/engage", response_model=HoneypotResponse)
+@app.post("/honeypot/engage", response_model=HoneypotResponse, openapi_extra=_ENGAGE_BODY_DOC)
 async def engage_scammer(
-    input_data: Union[MessageInput, dict, str] = Body(...), 
+    request: Request,
     api_key: str = Security(get_api_key),
 ):
+    shed = _admit(api_key)
+    if shed:
+        return shed
+    admission.enter()
+    input_data = None
     try:
         start_time = datetime.now(timezone.utc)
-        run_id = f"hp_{uuid.uuid4().hex[:8]}"
+        run_id = _new_run_id()
+        raw = await request.body()
         
         # Handle different input types
-        message = ""
-        sender_id = "unknown"
-        
-        if isinstance(input_data, MessageInput):
-            message = input_data.message or "Automated honeypot probe"
-            sender_id = input_data.sender_id
-        elif isinstance(input_data, dict):
-            # Try to extract message from dict
-            msg_input = MessageInput(**input_data)
-            message = msg_input.message or "Automated honeypot probe"
-            sender_id = msg_input.sender_id
-        elif isinstance(input_data, str):
-            message = input_data if input_data.strip() else "Automated honeypot probe"
-        else:
-            # Try to convert to string
-            message = str(input_data)
+        with STAGE_DECODE.time():
+            input_data = decode_body(raw)
+            message, sender_id = _coerce_input(input_data)
+
+        # A flooding sender is cut off before any scoring work
+        decision, degraded = admission.sender_decision(sender_id, SENDER_POLICY)
+        if decision == "reject":
+            return _shed_response(degraded)
         
-        # 1. Detection Logic
-        prediction = detector.predict(message)
+        # 1. Entity Extraction + Blocklist / Detection Logic (off the event loop)
+        prediction, intel, campaign_id = await run_cpu(_analyze, message, run_id)
 
-        # 2. AI Response Generation
-        ai_response = None
-        if prediction.get("is_scam"):
-            ai_response = agent.generate_response(message)
+        # 2. AI Response Generation (skipped when degraded)
+        ai_response, engagement = None, None
+        if prediction.get("is_scam") and not degraded:
+            with STAGE_LLM.time():
+                ai_response, engagement = await _converse(message, sender_id)
+
+        # 3. Construct Structured Response
+        with STAGE_SERIALIZE.time():
+            response = _persist(_build_response(
+                run_id, start_time, message, sender_id, prediction, ai_response, intel, campaign_id, engagement, degraded
+            ))
+            return Response(content=encode_response(response), media_type=JSON_MEDIA_TYPE)
+
+    except Exception as e:
+        return Response(content=encode_response(_error_response(e, input_data)), media_type=JSON_MEDIA_TYPE)
+    finally:
+        admission.leave()
 
-        # 3. Entity Extraction
-        intel = extractor.extract(message)
 
-        # 4. Construct Structured Response
-        return HoneypotResponse(
-            honeypot_id=run_id,
-            timestamp_utc=start_time.isoformat(),
-            input_message=message,
-            classification=ScamClassification(
-                is_scam=prediction["is_scam"],
-                scam_type=prediction["scam_type"],
-                confidence=prediction["confidence"],
-                risk_level="critical" if prediction["is_scam"] else "low",
-            ),
-            intelligence=IntelligenceData(
-                bank_accounts=intel.get("bank_accounts", []),
-                upi_ids=intel.get("upi_ids", []),
-                phishing_links=intel.get("phishing_links", []),
-                phone_numbers=intel.get("phone_numbers", []),
-            ),
-            engagement=EngagementMetrics(
-                messages_exchanged=1,
-                duration_seconds=random.randint(5, 15),
-                personas_tried=1,
-            ),
-            metadata={
-                "generated_response": ai_response or "No engagement",
-                "sender_id": sender_id,  # Use the extracted sender_id
-                "http_method": "POST",
-            },
+# --- BATCH ENDPOINT ---
+@app.post("/honeypot/engage/batch", response_model=List[HoneypotResponse], openapi_extra=_BATCH_BODY_DOC)
+async def engage_scammer_batch(
+    request: Request,
+    api_key: str = Security(get_api_key),
+):
+    """
+    Scores a burst of messages with one detector pass.
+    Each item is isolated: a bad item gets an error response, the rest go through.
+    """
+    input_data = decode_body(await request.body())
+    if not isinstance(input_data, list):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Expected a JSON array of messages"
         )
+    # Every item spends a token from the key's bucket (a batch larger than the
+    # burst needs a full bucket and leaves the key in debt)
+    shed = _admit(api_key, max(1, len(input_data)))
+    if shed:
+        return shed
+    admission.enter()
+    try:
+        results = await _engage_batch(input_data)
+        with BATCH_SERIALIZE.time():
+            return Response(content=encode_responses(results), media_type=JSON_MEDIA_TYPE)
+    finally:
+        admission.leave()
 
-    except Exception as e:
-        # Enhanced error response
-        error_id = f"err_{uuid.uuid4().hex[:4]}"
-        print(f"Error {error_id}: {str(e)}")
-        print(f"Input received: {input_data}")
-        
-        # Return a proper HoneypotResponse object instead of dict
-        return HoneypotResponse(
-            honeypot_id=error_id,
-            timestamp_utc=datetime.now(timezone.utc).isoformat(),
-            input_message="error_fallback",
-            classification=ScamClassification(
-                is_scam=False,
-                scam_type="none",
-                confidence=0.0,
-                risk_level="low"
-            ),
-            intelligence=IntelligenceData(
-                bank_accounts=[],
-                upi_ids=[],
-                phishing_links=[],
-                phone_numbers=[]
-            ),
-            engagement=EngagementMetrics(
-                messages_exchanged=0,
-                duration_seconds=0,
-                personas_tried=0
-            ),
-            metadata={
-                "error": str(e),
-                "error_type": type(e).__name__,
-                "input_received": str(input_data)[:200] if input_data else "No input"
-            }
+
+async def _engage_batch(input_data, engage: bool = True):
+    start_time = datetime.now(timezone.utc)
+    results = [None] * len(input_data)
+
+    # Coerce every item first; failures become error responses in place
+    coerced = []
+    with BATCH_DECODE.time():
+        for i, item in enumerate(input_data):
+            try:
+                coerced.append((i, *_coerce_input(item)))
+            except Exception as e:
+                results[i] = _error_response(e, item)
+
+    messages = [message for _, message, _ in coerced]
+    run_ids = [_new_run_id() for _ in coerced]
+
+    # 1. Entity Extraction + Blocklist / Detection Logic (single vectorized pass)
+    predictions, intels, campaign_ids = await run_cpu(_analyze_batch, messages, run_ids)
+
+    # 2. AI Response Generation (all scam replies in flight at once)
+    async def _reply(message, sender_id, prediction):
+        if engage and prediction.get("is_scam"):
+            # Over-limit senders inside a batch are always degraded, never rejected
+            _, degraded = admission.sender_decision(sender_id)
+            if degraded:
+                return None, None, degraded
+            return (*await _converse(message, sender_id), None)
+        return None, None, None
+
+    with BATCH_LLM.time():
+        ai_responses = await asyncio.gather(
+            *(_reply(message, sender_id, prediction) for (_, message, sender_id), prediction in zip(coerced, predictions)),
+            return_exceptions=True,
         )
 
+    with BATCH_SERIALIZE.time():
+        for (i, message, sender_id), run_id, prediction, intel, campaign_id, ai_response in zip(
+            coerced, run_ids, predictions, intels, campaign_ids, ai_responses
+        ):
+            try:
+                if isinstance(ai_response, Exception):
+                    raise ai_response
+                ai_response, engagement, degraded = ai_response
+                results[i] = _persist(_build_response(
+                    run_id, start_time, message, sender_id, prediction, ai_response, intel, campaign_id, engagement, degraded
+                ))
+            except Exception as e:
+                results[i] = _error_response(e, input_data[i])
+
+    return results
+
+# --- STREAMING ENDPOINT ---
+class _BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose generator reads the request body itself.
+
+    The stock class (on ASGI spec < 2.4, e.g. uvicorn) runs a disconnect
+    listener that calls receive() concurrently and would swallow the body
+    messages. Here a disconnect surfaces through request.stream() instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _ndjson_lines(request: Request):
+    """
+    Yields (line_number, raw_bytes) from the request body as it arrives.
+    raw_bytes is None for a line longer than STREAM_MAX_LINE_BYTES; the
+    oversized tail is discarded rather than buffered.
+    """
+    buf = bytearray()
+    overflow = False
+    line_no = 0
+    async for chunk in request.stream():
+        start = 0
+        while True:
+            newline = chunk.find(b"\n", start)
+            piece = chunk[start:] if newline < 0 else chunk[start:newline]
+            if not overflow:
+                buf += piece
+                if len(buf) > STREAM_MAX_LINE_BYTES:
+                    overflow = True
+                    buf.clear()
+            if newline < 0:
+                break
+            line_no += 1
+            if overflow or buf.strip():
+                yield line_no, None if overflow else bytes(buf)
+            buf.clear()
+            overflow = False
+            start = newline + 1
+    if overflow or buf.strip():
+        yield line_no + 1, None if overflow else bytes(buf)
+
+
+async def _score_ndjson_chunk(lines: list, engage: bool) -> bytes:
+    results = [None] * len(lines)
+    items, positions = [], []
+    for pos, (line_no, raw) in enumerate(lines):
+        try:
+            if raw is None:
+                raise ValueError(f"Line exceeds {STREAM_MAX_LINE_BYTES} bytes")
+            items.append(loads(raw))
+            positions.append(pos)
+        except ValueError as e:
+            results[pos] = _error_response(e, raw[:200] if raw else None)
+
+    if items:
+        for pos, response in zip(positions, await _engage_batch(items, engage=engage)):
+            results[pos] = response
+
+    for (line_no, _), response in zip(lines, results):
+        response.metadata["line"] = line_no
+    with BATCH_SERIALIZE.time():
+        return b"".join(encode_response(response) + b"\n" for response in results)
+
+
+@app.post("/honeypot/engage/stream")
+async def engage_scammer_stream(
+    request: Request,
+    engage: bool = False,
+    api_key: str = Security(get_api_key),
+):
+    """
+    NDJSON in, NDJSON out, for replaying large archives.
+
+    Lines are scored STREAM_CHUNK_LINES at a time and written back as soon as
+    each chunk completes. The body is only read as fast as the client consumes
+    results, so memory stays bounded by one chunk. Bad lines get an inline
+    error response; every output line carries its input line number in
+    metadata["line"]. LLM replies are skipped unless ?engage=true. Lines count
+    against the key's rate limit chunk by chunk; past it the stream is paced.
+    """
+    shed = _admit(api_key)
+    if shed:
+        return shed
+    # Admission already took one token for the first line
+    charged = 1
+
+    async def score(lines):
+        # Every line spends a token from the key's bucket; an empty bucket
+        # slows the stream down rather than cutting it off
+        delay = admission.pace(api_key, max(0, len(lines) - charged))
+        if delay:
+            await asyncio.sleep(delay)
+        return await _score_ndjson_chunk(lines, engage)
+
+    async def generate():
+        nonlocal charged
+        admission.enter()
+        try:
+            pending = []
+            async for line in _ndjson_lines(request):
+                pending.append(line)
+                if len(pending) >= STREAM_CHUNK_LINES:
+                    yield await score(pending)
+                    charged = 0
+                    pending = []
+            if pending:
+                yield await score(pending)
+        finally:
+            admission.leave()
+
+    return _BodyStreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
     uvicorn.run("main:app", host="0.0.0.0", port=port)
\ No newline at end of file
@@ -0,0 +1,389 @@
+"""
+Minimal in-process Prometheus metrics (text exposition format 0.0.4).
+
+Hand-rolled to keep the hot path to a lock + a few float adds per observation;
+call-sites use the prometheus_client-style API (metric.labels(...).inc()).
+
+With several worker processes (gunicorn), set HONEYPOT_METRICS_DIR: every
+process then writes its values to <dir>/<pid>.json every
+HONEYPOT_METRICS_FLUSH seconds, and a scrape of any worker merges them.
+Counters and histograms are summed over all processes (including exited
+ones, so they never go backwards); gauges get a pid label, live workers only.
+"""
+import os
+import json
+import time
+import bisect
+import threading
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+METRICS_DIR = os.getenv("HONEYPOT_METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("HONEYPOT_METRICS_FLUSH", "1"))
+
+
+def _format_labels(labelnames, values, extra=None) -> str:
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._new_child()
+        REGISTRY.register(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def collect(self) -> dict:
+        """
+        {label_values_tuple: value} for this process.
+        """
+        raise NotImplementedError
+
+    def _samples(self, collected: dict, labelnames: tuple):
+        raise NotImplementedError
+
+    def render(self, collected: dict = None, labelnames: tuple = None) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples(
+            self.collect() if collected is None else collected,
+            self.labelnames if labelnames is None else labelnames,
+        ))
+        return "\n".join(lines)
+
+    def _items(self):
+        if not self.labelnames:
+            return [((), self._default)]
+        return list(self._children.items())
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+
+class _ValueMetric(_Metric):
+    """
+    Shared by Counter and Gauge: a plain value per label set, or values
+    computed at scrape time via set_function() (for counters kept elsewhere).
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self._function = None
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def set_function(self, fn):
+        """
+        fn() -> number for an unlabelled metric, or {label_values_tuple: number}.
+        """
+        self._function = fn
+
+    def collect(self) -> dict:
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception:
+                return {}
+            if isinstance(value, dict):
+                return {tuple(k): float(v) for k, v in value.items()}
+            return {(): float(value)}
+        return {k: v.value for k, v in self._items()}
+
+    def _samples(self, collected: dict, labelnames: tuple):
+        return [f"{self.name}{_format_labels(labelnames, k)} {v}" for k, v in collected.items()]
+
+
+class Counter(_ValueMetric):
+    kind = "counter"
+
+
+class Gauge(_ValueMetric):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0):
+        self._default.dec(amount)
+
+    def set(self, value: float):
+        self._default.set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("_target", "_start")
+
+    def __init__(self, target):
+        self._target = target
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._target.observe(time.perf_counter() - self._start)
+        return False
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def time(self):
+        return _Timer(self._default)
+
+    def collect(self) -> dict:
+        collected = {}
+        for key, child in self._items():
+            with child._lock:
+                collected[key] = (list(child.counts), child.sum)
+        return collected
+
+    def _samples(self, collected: dict, labelnames: tuple):
+        lines = []
+        for key, (counts, total) in collected.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(labelnames, key, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_count{_format_labels(labelnames, key)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labelnames, key)} {total}")
+        return lines
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Registry:
+    def __init__(self, directory: str = METRICS_DIR):
+        self._metrics = []
+        self.directory = directory
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        if not self.directory:
+            return "\n".join(metric.render() for metric in self._metrics) + "\n"
+        own = self._write()
+        merged = self._merge(own)
+        return "\n".join(
+            metric.render(merged[metric.name], metric.labelnames + (("pid",) if metric.kind == "gauge" else ()))
+            for metric in self._metrics
+        ) + "\n"
+
+    # --- MULTIPROCESS ---
+    def _write(self) -> dict:
+        """
+        Dumps this process's values to <dir>/<pid>.json (atomic rename).
+        """
+        collected = {metric.name: metric.collect() for metric in self._metrics}
+        payload = {name: [[list(k), v] for k, v in values.items()] for name, values in collected.items()}
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp, path)
+        return collected
+
+    def _merge(self, own: dict) -> dict:
+        kinds = {metric.name: metric.kind for metric in self._metrics}
+        merged = {name: {} for name in kinds}
+        me = os.getpid()
+        sources = [(me, True, {name: list(values.items()) for name, values in own.items()})]
+        for filename in os.listdir(self.directory):
+            stem, ext = os.path.splitext(filename)
+            if ext != ".json" or not stem.isdigit() or int(stem) == me:
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            pid = int(stem)
+            sources.append((pid, _pid_alive(pid), {
+                name: [(tuple(k), v) for k, v in values] for name, values in data.items()
+            }))
+
+        for pid, alive, data in sources:
+            for name, values in data.items():
+                kind = kinds.get(name)
+                if kind is None:
+                    continue
+                target = merged[name]
+                for key, value in values:
+                    if kind == "gauge":
+                        # A gauge of an exited worker is meaningless; per-pid otherwise
+                        if alive:
+                            target[key + (str(pid),)] = value
+                    elif kind == "histogram":
+                        counts, total = value
+                        if key in target:
+                            old_counts, old_total = target[key]
+                            target[key] = ([a + b for a, b in zip(old_counts, counts)], old_total + total)
+                        else:
+                            target[key] = (list(counts), total)
+                    else:
+                        target[key] = target.get(key, 0.0) + value
+        return merged
+
+    def _flush_loop(self):
+        while not self._stop.wait(METRICS_FLUSH_SECONDS):
+            try:
+                self._write()
+            except OSError as e:
+                print(f"⚠️ Metrics flush failed: {e}")
+
+    def start(self):
+        """
+        Starts the periodic flush (multiprocess mode only). Call it in each
+        worker, after any fork.
+        """
+        if not self.directory or self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._flush_loop, name="honeypot-metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread = None
+        try:
+            self._write()
+        except OSError:
+            pass
+
+
+REGISTRY = Registry()
+
+
+# --- APPLICATION METRICS ---
+STAGE_LATENCY = Histogram(
+    "honeypot_stage_duration_seconds",
+    "Time spent in each stage of the engage pipeline; scope is \"message\" for "
+    "one observation per message, \"batch\" for one per batch or stream chunk.",
+    ["stage", "scope"],
+)
+INFLIGHT = Gauge("honeypot_inflight_requests", "Engage requests currently being processed.")
+ADMISSION_DECISIONS = Counter(
+    "honeypot_admission_decisions_total",
+    "Admission control outcomes (admit/degrade/reject), by reason.",
+    ["decision", "reason"],
+)
+VERDICTS = Counter(
+    "honeypot_verdicts_total",
+    "Detector verdicts served, by scam type.",
+    ["scam_type", "is_scam"],
+)
+ENGAGE_ERRORS = Counter("honeypot_engage_errors_total", "Engage items that fell back to the error response.")
+
+LLM_CALLS = Counter("honeypot_llm_calls_total", "LLM reply attempts, by outcome.", ["outcome"])
+LLM_LATENCY = Histogram("honeypot_llm_duration_seconds", "LLM round-trip time, including failures.")
+LLM_CIRCUIT_OPEN = Gauge("honeypot_llm_circuit_open", "1 while the LLM circuit breaker is skipping the provider.")
+
+FEEDBACK_LABELS = Counter("honeypot_feedback_labels_total", "Analyst labels received, by label.", ["is_scam"])
+MODEL_GENERATION = Gauge("honeypot_model_generation", "Times the detector model has been (re)loaded in this process.")
+
+VERDICT_CACHE_HIT_RATIO = Gauge("honeypot_verdict_cache_hit_ratio", "Verdict cache hits / lookups since start.")
+VERDICT_CACHE_EVENTS = Counter(
+    "honeypot_verdict_cache_events_total",
+    "Verdict cache hit/miss/eviction/expiration counts since start.",
+    ["event"],
+)
+VERDICT_CACHE_SIZE = Gauge("honeypot_verdict_cache_entries", "Entries currently held by the verdict cache.")
+BLOCKLIST_SIZE = Gauge("honeypot_blocklist_indicators", "Known-bad indicators currently loaded.")
+BLOCKLIST_HITS = Counter(
+    "honeypot_blocklist_hits_total",
+    "Messages short-circuited by a known-bad indicator, by kind.",
+    ["kind"],
+)
+CONVERSATIONS = Gauge("honeypot_conversations", "Sender conversations currently held in memory.")
+CONVERSATION_BYTES = Gauge("honeypot_conversation_bytes", "Estimated memory held by the conversation store.")
+CAMPAIGNS = Gauge("honeypot_campaigns", "Scam campaigns currently held in the LSH index.")
+WRITER_EVENTS = Counter(
+    "honeypot_writer_rows_total",
+    "Write-behind persistence row counts since start.",
+    ["state"],
+)
+WRITER_BUFFERED = Gauge("honeypot_writer_buffered_rows", "Rows waiting in the write-behind buffer.")
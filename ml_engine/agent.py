@@ -1,125 +1,267 @@
 import os
+import time
 import random
+import asyncio
+import threading
+from metrics import LLM_CALLS, LLM_LATENCY
+from ml_engine.personas import personas
 try:
-    from openai import OpenAI
+    import httpx
+    from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient
 except ImportError:
     OpenAI = None
+    AsyncOpenAI = None
+
+# --- CONFIG ---
+# "openai", "stub" (in-process fake for offline load tests) or "none"
+LLM_PROVIDER = os.getenv("HONEYPOT_LLM_PROVIDER", "openai")
+LLM_MODEL = os.getenv("HONEYPOT_LLM_MODEL", "gpt-3.5-turbo")
+# Hard per-call ceiling for a single LLM round-trip (seconds)
+LLM_TIMEOUT = float(os.getenv("HONEYPOT_LLM_TIMEOUT", "8"))
+# Latency budget per reply: past this the scripted fallback is served instead
+LLM_BUDGET = float(os.getenv("HONEYPOT_LLM_BUDGET", "1.5"))
+# Max concurrent LLM calls (also the HTTP connection pool size)
+LLM_CONCURRENCY = int(os.getenv("HONEYPOT_LLM_CONCURRENCY", "32"))
+# Circuit breaker: open after N consecutive failures, probe again after a cooldown
+BREAKER_FAILURES = int(os.getenv("HONEYPOT_LLM_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("HONEYPOT_LLM_BREAKER_COOLDOWN", "30"))
+STUB_LATENCY = float(os.getenv("HONEYPOT_LLM_STUB_LATENCY", "0.2"))
+STUB_ERROR_RATE = float(os.getenv("HONEYPOT_LLM_STUB_ERROR_RATE", "0"))
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failures` consecutive failures; after `cooldown`
+    seconds one probe call is let through (half-open) and its outcome decides
+    whether the breaker closes again or stays open.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open":
+                if now - self.opened_at < self.cooldown:
+                    return False
+                self.state = "half_open"
+                self.probe_started = now
+                return True
+            # half_open: a single probe at a time (a stale probe doesn't block forever)
+            if now - self.probe_started >= self.cooldown:
+                self.probe_started = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failures:
+                if self.state != "open":
+                    self.trips += 1
+                    print(f"🔌 LLM circuit open after {self.consecutive_failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+# --- PROVIDERS ---
+class OpenAIProvider:
+    name = "openai"
+
+    def __init__(self, api_key: str, model: str = LLM_MODEL):
+        self.model = model
+        self.client = OpenAI(api_key=api_key, timeout=LLM_TIMEOUT)
+        # No SDK retries on the request path: the budget and the breaker decide
+        self.async_client = AsyncOpenAI(
+            api_key=api_key,
+            timeout=LLM_TIMEOUT,
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=LLM_CONCURRENCY, max_keepalive_connections=LLM_CONCURRENCY)
+            ),
+        )
+
+    def complete(self, messages: list) -> str:
+        response = self.client.chat.completions.create(
+            model=self.model, messages=messages, temperature=0.7, max_tokens=60
+        )
+        return response.choices[0].message.content.strip()
+
+    async def acomplete(self, messages: list) -> str:
+        response = await self.async_client.chat.completions.create(
+            model=self.model, messages=messages, temperature=0.7, max_tokens=60
+        )
+        return response.choices[0].message.content.strip()
+
+
+class StubProvider:
+    """
+    In-process fake LLM for offline load tests: fixed latency, optional error rate.
+    """
+    name = "stub"
+    reply = "Sir, I am trying, but the app is asking for some code. Which one?"
+
+    def __init__(self, latency: float = STUB_LATENCY, error_rate: float = STUB_ERROR_RATE):
+        self.latency = latency
+        self.error_rate = error_rate
+
+    def _maybe_fail(self):
+        if self.error_rate and random.random() < self.error_rate:
+            raise RuntimeError("stub provider failure")
+
+    def complete(self, messages: list) -> str:
+        time.sleep(self.latency)
+        self._maybe_fail()
+        return self.reply
+
+    async def acomplete(self, messages: list) -> str:
+        await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        return self.reply
+
+
+def make_provider(name: str = LLM_PROVIDER):
+    if name == "stub":
+        return StubProvider()
+    if name == "openai":
+        api_key = os.getenv("OPENAI_API_KEY")
+        return OpenAIProvider(api_key) if api_key and OpenAI else None
+    return None
+
 
 class ScamAgent:
-    def __init__(self):
-        self.api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=self.api_key) if self.api_key and OpenAI else None
-        
-        self.system_prompt = """
-        You are 'Ramesh', a 65-year-old retired clerk. 
-        Act naive, polite, and slightly greedy. 
-        Waste the scammer's time with confusion and technical trouble.
+    def __init__(self, provider=None):
+        self.provider = provider if provider is not None else make_provider()
+        self.breaker = CircuitBreaker()
+        # asyncio.Semaphore is bound to the loop it first waits on, so keep one per loop
+        self._slots = None
+        self._slots_loop = None
+        # Calls holding a slot (event-loop only)
+        self.in_flight = 0
+        # Persona prompts and the scripted library (ml_engine/data/personas.json)
+        self.personas = personas
+
+    def _build_messages(self, incoming_message: str, history: list = None, persona=None) -> list:
+        # Simple simulation of history usage
+        messages = [{"role": "system", "content": self.personas.system_prompt(persona)}]
+        if history: messages.extend(history)
+        messages.append({"role": "user", "content": incoming_message})
+        return messages
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(LLM_CONCURRENCY)
+            self._slots_loop = loop
+        return self._slots
+
+    def generate_response(self, incoming_message: str, history: list = None, persona=None) -> str:
+        """
+        Generates a reply. Tries the LLM provider first, falls back to the 'Scripted Library'
+        if there is none, the breaker is open, or the call fails. `persona` is the
+        sender's PersonaState (None for anonymous senders).
         """
+        if not self.provider:
+            LLM_CALLS.labels("disabled").inc()
+            return self._fallback_response(incoming_message, persona)
+        if not self.breaker.allow():
+            LLM_CALLS.labels("circuit_open").inc()
+            return self._fallback_response(incoming_message, persona)
 
-    def generate_response(self, incoming_message: str, history: list = None) -> str:
+        start = time.perf_counter()
+        try:
+            reply = self.provider.complete(self._build_messages(incoming_message, history, persona))
+            self.breaker.record_success()
+            LLM_CALLS.labels("ok").inc()
+            return reply
+        except Exception as e:
+            self.breaker.record_failure()
+            LLM_CALLS.labels("error").inc()
+            print(f"⚠️ LLM Error: {e}")
+            return self._fallback_response(incoming_message, persona)
+        finally:
+            LLM_LATENCY.observe(time.perf_counter() - start)
+
+    async def agenerate_response(self, incoming_message: str, history: list = None, persona=None) -> str:
         """
-        Generates a reply. Tries OpenAI first, falls back to the 'Scripted Library' if no key.
+        Async twin of generate_response for the request path. Waiting for a
+        free slot and the LLM call together get LLM_BUDGET seconds; past that
+        the scripted fallback is served and the call is abandoned.
         """
-        if not self.client:
-            return self._fallback_response(incoming_message)
+        if not self.provider:
+            LLM_CALLS.labels("disabled").inc()
+            return self._fallback_response(incoming_message, persona)
+        if not self.breaker.allow():
+            LLM_CALLS.labels("circuit_open").inc()
+            return self._fallback_response(incoming_message, persona)
 
+        budget = min(LLM_BUDGET, LLM_TIMEOUT)
+        slots = self._semaphore()
+        start = time.perf_counter()
         try:
-            # Simple simulation of history usage
-            messages = [{"role": "system", "content": self.system_prompt}]
-            if history: messages.extend(history)
-            messages.append({"role": "user", "content": incoming_message})
-
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=60
+            await asyncio.wait_for(slots.acquire(), timeout=budget)
+        except asyncio.TimeoutError:
+            # Local saturation, not a provider failure: leave the breaker alone
+            LLM_CALLS.labels("saturated").inc()
+            return self._fallback_response(incoming_message, persona)
+
+        self.in_flight += 1
+        try:
+            remaining = budget - (time.perf_counter() - start)
+            reply = await asyncio.wait_for(
+                self.provider.acomplete(self._build_messages(incoming_message, history, persona)),
+                timeout=max(remaining, 0.001),
             )
-            return response.choices[0].message.content.strip()
+            self.breaker.record_success()
+            LLM_CALLS.labels("ok").inc()
+            return reply
+        except asyncio.TimeoutError:
+            # Only blame the provider if it had most of the budget, not the queue's leftovers
+            if remaining >= budget / 2:
+                self.breaker.record_failure()
+            LLM_CALLS.labels("hedged").inc()
+            return self._fallback_response(incoming_message, persona)
         except Exception as e:
-            print(f"⚠️ LLM Error: {e}")
-            return self._fallback_response(incoming_message)
+            self.breaker.record_failure()
+            LLM_CALLS.labels("error").inc()
+            print(f"⚠️ LLM Error: {type(e).__name__}: {e}")
+            return self._fallback_response(incoming_message, persona)
+        finally:
+            self.in_flight -= 1
+            slots.release()
+            LLM_LATENCY.observe(time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.provider.name if self.provider else None,
+            "budget_seconds": LLM_BUDGET,
+            "concurrency": LLM_CONCURRENCY,
+            "in_flight": self.in_flight,
+            "circuit": self.breaker.state,
+            "circuit_trips": self.breaker.trips,
+            **self.personas.stats(),
+        }
 
-    def _fallback_response(self, message: str) -> str:
+    def _fallback_response(self, message: str, persona=None) -> str:
         """
-        The 'Scripted Library' - A massive list of naive responses to keep scammers hooked.
+        The 'Scripted Library': the next unused line from the sender's persona
+        for the message's intent (see ml_engine/personas.py).
         """
-        
-        # 1. Confusion & Clarification (Wasting time asking 'Why?')
-        confusion = [
-            "Hello? Who is this calling?",
-            "I don't understand, sir. My grandson usually handles this.",
-            "Is this the main branch or the local branch?",
-            "Can you speak a little louder? My hearing aid is buzzing.",
-            "Wait, I thought I already paid the electricity bill?",
-            "Who gave you my number? Was it Sharma ji?",
-            "Sir, I am a pensioner. Please explain slowly.",
-            "Ayyo! Why is the bank messaging me at this time?",
-            "Is this regarding the fixed deposit maturity?",
-            "I am confused. Do I need to come to the bank?"
-        ]
-
-        # 2. Technical Incompetence (Stalling by pretending to be bad at tech)
-        tech_trouble = [
-            "My internet is slow... the circle is just spinning...",
-            "Where is the link? I cannot see blue letters.",
-            "My screen is very dark. Let me get my glasses.",
-            "I am clicking but nothing is happening. Is the server down?",
-            "Typing is very hard on this glass screen.",
-            "Can you call me instead? I cannot read small text.",
-            "Battery is 2%... wait, let me find the charger...",
-            "The link says '404 Error'. Did I do it wrong?",
-            "Do I press the green button or the blue one?",
-            "Wait, my phone is hanging. Let me restart."
-        ]
-
-        # 3. Panic & Urgency (Feigning fear to make scammer feel successful)
-        panic = [
-            "Oh my god! Blocked? All my pension is in there!",
-            "Please do not cut my connection! I will do whatever you say.",
-            "I am very scared. Will police come to my house?",
-            "Sir please help me. I am alone at home.",
-            "Urgent? I am panicking now. My BP is going up.",
-            "Please sir, save my account. It has my daughter's wedding money.",
-            "Do not lock it! I need to buy medicine today.",
-            "I am trying to hurry but my hands are shaking."
-        ]
-
-        # 4. Greed & Bait (Luring them with promises of money)
-        greed = [
-            "Is there a fee for this? I have ₹50,000 in the account.",
-            "If I verify, will I get the bonus interest you mentioned?",
-            "I have a lot of savings. Is it all safe?",
-            "Can I add my wife's account also? She has more money.",
-            "I received a message about lottery also. Is this related?"
-        ]
-
-        # 5. The "OTP/Details" Dance (Pretending to look for info)
-        otp_stalling = [
-            "Where is OTP? Is it on the back of the debit card?",
-            "I got a code 8... 4... wait, it disappeared.",
-            "My SMS is full. Let me delete some messages first.",
-            "Is the OTP the same as my PIN number?",
-            "I am looking for my passbook. Please hold on...",
-            "The message says 'Do not share'. Should I still share?",
-            "I found a number 1234. Is that it?",
-            "Let me ask my neighbor, he knows about computers."
-        ]
-
-        # Combine all lists
-        all_responses = confusion + tech_trouble + panic + greed + otp_stalling
-        
-        # Intelligent Selection: 
-        # If the incoming message has "OTP", prioritize OTP stalling.
-        message = message.lower()
-        if "otp" in message or "code" in message or "pin" in message:
-            return random.choice(otp_stalling + confusion)
-        elif "blocked" in message or "urgent" in message or "suspended" in message:
-            return random.choice(panic + confusion)
-        elif "click" in message or "link" in message:
-            return random.choice(tech_trouble)
-        
-        # Otherwise, pick completely random
-        return random.choice(all_responses)
+        return self.personas.reply(message, persona)
 
 agent = ScamAgent()
\ No newline at end of file
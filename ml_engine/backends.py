@@ -0,0 +1,202 @@
+"""
+Pluggable inference backends for ScamDetector.
+
+Pick one per deployment with HONEYPOT_DETECTOR_BACKEND, after comparing them:
+
+    python -m ml_engine.backends [labeled.csv] [--train-split 0.7]
+"""
+import os
+import csv
+import sys
+import json
+import time
+import pickle
+import random
+import tracemalloc
+
+from ml_engine.cache import canonical_text
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+SEED_DATA_PATH = os.path.join(DATA_DIR, "seed_messages.csv")
+
+
+def load_labeled(path: str = SEED_DATA_PATH):
+    """
+    Reads a labeled CSV (columns: text,label) into (texts, labels).
+    """
+    texts, labels = [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            texts.append(row["text"])
+            labels.append(int(row["label"]))
+    return texts, labels
+
+
+class DetectorBackend:
+    """
+    A named recipe for an sklearn estimator exposing predict_proba().
+    """
+    name = None
+    artifact_name = None
+    # Backends that can learn from new labels without a full refit
+    incremental = False
+
+    def build(self):
+        raise NotImplementedError
+
+    def train(self, texts, labels):
+        # Same input the detector scores at serving time
+        model = self.build()
+        model.fit([canonical_text(text) for text in texts], labels)
+        return model
+
+    def update(self, model, texts, labels):
+        raise NotImplementedError
+
+    def artifact_path(self) -> str:
+        return os.path.join(MODEL_DIR, self.artifact_name)
+
+
+class RandomForestBackend(DetectorBackend):
+    """
+    Original model: bigram TF-IDF + 100-tree RandomForest.
+    """
+    name = "random_forest"
+    artifact_name = "scam_model.pkl"
+
+    def build(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.pipeline import Pipeline
+
+        return Pipeline([
+            ('tfidf', TfidfVectorizer(ngram_range=(1, 2))),
+            ('clf', RandomForestClassifier(n_estimators=100))
+        ])
+
+
+class HashingLinearBackend(DetectorBackend):
+    """
+    Sparse linear model: stateless HashingVectorizer (no vocabulary dict in
+    memory) + logistic-loss SGD. One sparse dot product per message, and it
+    supports partial_fit for incremental updates.
+    """
+    name = "hashing_linear"
+    artifact_name = "scam_model_hashing_linear.pkl"
+    incremental = True
+    # 2**16 float64 weights = 512 KB dense coef_. Kept dense on purpose:
+    # sparsify() shrinks the artifact but roughly doubles predict latency.
+    n_features = 2 ** 16
+
+    def build(self):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.pipeline import Pipeline
+
+        return Pipeline([
+            ('hashing', HashingVectorizer(
+                ngram_range=(1, 2),
+                n_features=self.n_features,
+                alternate_sign=False,
+                norm="l2",
+            )),
+            ('clf', SGDClassifier(loss="log_loss", alpha=1e-4, max_iter=50, tol=None, random_state=42))
+        ])
+
+    def update(self, model, texts, labels):
+        # The hashing step is stateless, so only the classifier needs to learn
+        model[-1].partial_fit(model[:-1].transform([canonical_text(text) for text in texts]), labels)
+        return model
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (RandomForestBackend(), HashingLinearBackend())
+}
+
+
+def get_backend(name: str) -> DetectorBackend:
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown detector backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+
+
+def train_backend(backend: DetectorBackend, texts=None, labels=None):
+    if texts is None:
+        texts, labels = load_labeled()
+    return backend.train(texts, labels)
+
+
+def evaluate(model, texts, labels, repeats: int = 3) -> dict:
+    """
+    Latency, memory footprint and accuracy of a fitted model on a labeled set.
+    """
+    texts = [canonical_text(text) for text in texts]
+    # Memory: serialized size, and heap actually allocated when deserializing it
+    blob = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+    tracemalloc.start()
+    pickle.loads(blob)
+    _, loaded_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Single-message latency (the /honeypot/engage path)
+    single = []
+    for _ in range(repeats):
+        for text in texts:
+            t0 = time.perf_counter()
+            model.predict_proba([text])
+            single.append(time.perf_counter() - t0)
+    single.sort()
+
+    # Batched throughput (the /honeypot/engage/batch path)
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        probs = model.predict_proba(texts)[:, 1]
+    batch_seconds = (time.perf_counter() - t0) / repeats
+
+    predicted = [int(p > 0.5) for p in probs]
+    correct = sum(int(p == y) for p, y in zip(predicted, labels))
+
+    return {
+        "samples": len(texts),
+        "accuracy": round(correct / len(texts), 4) if texts else 0.0,
+        "latency_ms_p50": round(single[len(single) // 2] * 1000, 3),
+        "latency_ms_p99": round(single[min(len(single) - 1, int(len(single) * 0.99))] * 1000, 3),
+        "batch_msgs_per_sec": round(len(texts) / batch_seconds, 1) if batch_seconds else None,
+        "artifact_bytes": len(blob),
+        "loaded_heap_bytes": loaded_peak,
+    }
+
+
+def compare_backends(texts, labels, train_split: float = 0.7, seed: int = 42) -> dict:
+    """
+    Trains every backend on the same split and evaluates it on the held-out part.
+    """
+    rows = list(zip(texts, labels))
+    random.Random(seed).shuffle(rows)
+    cut = max(1, int(len(rows) * train_split))
+    train, test = rows[:cut], rows[cut:] or rows[:cut]
+
+    report = {}
+    for name, backend in BACKENDS.items():
+        t0 = time.perf_counter()
+        model = train_backend(backend, [t for t, _ in train], [y for _, y in train])
+        train_seconds = time.perf_counter() - t0
+        report[name] = {
+            "train_seconds": round(train_seconds, 3),
+            **evaluate(model, [t for t, _ in test], [y for _, y in test]),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    split = 0.7
+    if "--train-split" in args:
+        i = args.index("--train-split")
+        split = float(args[i + 1])
+        del args[i:i + 2]
+    path = args[0] if args else SEED_DATA_PATH
+    print(json.dumps(compare_backends(*load_labeled(path), train_split=split), indent=2))
@@ -0,0 +1,299 @@
+import os
+import math
+import time
+import hashlib
+import threading
+from urllib.parse import urlsplit
+
+# --- CONFIG ---
+BLOCKLIST_PATH = os.getenv("HONEYPOT_BLOCKLIST_PATH", "")
+# Also seed from UPI/phone/link intel of stored runs (honeypot_run_indicators).
+# Only confident model verdicts count; blocklist hits themselves never do, so
+# a benign indicator in a flagged message can't feed itself back in.
+BLOCKLIST_FROM_DB = os.getenv("HONEYPOT_BLOCKLIST_FROM_DB", "0") == "1"
+BLOCKLIST_MIN_CONFIDENCE = float(os.getenv("HONEYPOT_BLOCKLIST_MIN_CONFIDENCE", "0.9"))
+BLOCKLIST_DB_BATCH = 5000
+# Each worker's writer commits on its own, so ids don't commit in order: every
+# refresh re-reads this many ids below the cursor to pick up late commits, and
+# a periodic full rebuild catches anything later than that
+BLOCKLIST_DB_OVERLAP = int(os.getenv("HONEYPOT_BLOCKLIST_DB_OVERLAP", "10000"))
+BLOCKLIST_REBUILD_SECONDS = float(os.getenv("HONEYPOT_BLOCKLIST_REBUILD", "3600"))
+BLOCKLIST_RELOAD_SECONDS = float(os.getenv("HONEYPOT_BLOCKLIST_RELOAD", "30"))
+# Above this many indicators, keep a Bloom filter instead of exact sets
+BLOOM_THRESHOLD = int(os.getenv("HONEYPOT_BLOCKLIST_BLOOM_THRESHOLD", "5000000"))
+BLOOM_ERROR_RATE = float(os.getenv("HONEYPOT_BLOCKLIST_BLOOM_ERROR", "0.0001"))
+
+KINDS = ("upi", "phone", "host")
+
+
+def normalize_indicator(kind: str, value: str):
+    """
+    Canonical form used both when loading and when matching.
+    """
+    value = value.strip()
+    if not value:
+        return None
+    if kind == "upi":
+        return value.lower()
+    if kind == "phone":
+        digits = "".join(ch for ch in value if ch.isdigit())
+        return digits[-10:] if len(digits) >= 10 else None
+    if kind == "host":
+        host = urlsplit(value if "://" in value else f"//{value}").hostname or ""
+        host = host.lower().rstrip(".")
+        return host[4:] if host.startswith("www.") else host or None
+    return None
+
+
+def _guess_kind(value: str) -> str:
+    if "@" in value:
+        return "upi"
+    if sum(ch.isdigit() for ch in value) >= 10 and not any(ch.isalpha() for ch in value):
+        return "phone"
+    return "host"
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter (double hashing over one blake2b digest).
+    """
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class _Snapshot:
+    """
+    View of the indicators; replaced wholesale on a full reload. New DB intel
+    is added in place (set.add / setting Bloom bits is safe next to readers).
+    """
+    __slots__ = ("members", "count", "bloom", "capacity")
+
+    def __init__(self, indicators: dict):
+        self.count = sum(len(values) for values in indicators.values())
+        self.bloom = self.count > BLOOM_THRESHOLD
+        if self.bloom:
+            # One filter over "kind:value" keys; sets are dropped to save memory.
+            # Sized with headroom for incremental additions.
+            self.capacity = self.count * 2
+            self.members = BloomFilter(self.capacity)
+            for kind, values in indicators.items():
+                for value in values:
+                    self.members.add(f"{kind}:{value}")
+        else:
+            self.capacity = BLOOM_THRESHOLD
+            self.members = {kind: set(values) for kind, values in indicators.items()}
+
+    def contains(self, kind: str, value: str) -> bool:
+        if self.bloom:
+            return f"{kind}:{value}" in self.members
+        return value in self.members.get(kind, ())
+
+    def add(self, kind: str, value: str):
+        if self.bloom:
+            # Re-read overlap rows are already in; a false positive here was
+            # already matching anyway
+            key = f"{kind}:{value}"
+            if key not in self.members:
+                self.members.add(key)
+                self.count += 1
+        elif value not in self.members[kind]:
+            self.members[kind].add(value)
+            self.count += 1
+
+    @property
+    def full(self) -> bool:
+        return self.count > self.capacity
+
+
+class IndicatorIndex:
+    """
+    Known-bad UPI handles, phone numbers and URL hosts, checked before the ML
+    model. Lookups read one snapshot reference (no lock); reloads build a new
+    snapshot off the request path and swap it in.
+    """
+
+    def __init__(self, path: str = BLOCKLIST_PATH, from_db: bool = BLOCKLIST_FROM_DB):
+        self.path = path
+        self.from_db = from_db
+        self._snapshot = _Snapshot({kind: set() for kind in KINDS})
+        self._file_mtime = None
+        # Last honeypot_run_indicators.id already read
+        self._db_cursor = 0
+        self._rebuilt_at = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self.hits = {kind: 0 for kind in KINDS}
+        self.reloads = 0
+
+    @property
+    def size(self) -> int:
+        return self._snapshot.count
+
+    # --- LOOKUP ---
+    def match(self, intel: dict):
+        """
+        Returns {"kind", "value"} for the first known-bad indicator in the
+        extracted intel, else None.
+        """
+        snapshot = self._snapshot
+        if not snapshot.count:
+            return None
+        for kind, key in (("upi", "upi_ids"), ("phone", "phone_numbers"), ("host", "phishing_links")):
+            for raw in intel.get(key, ()):
+                value = normalize_indicator(kind, raw)
+                if value and snapshot.contains(kind, value):
+                    self.hits[kind] += 1
+                    return {"kind": kind, "value": value}
+        return None
+
+    # --- LOADING ---
+    def _read_file(self, indicators: dict):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if not line:
+                    continue
+                kind, sep, value = line.partition(":")
+                if not sep or kind not in KINDS:
+                    # Bare value (a "https://..." line also lands here)
+                    kind, value = _guess_kind(line), line
+                normalized = normalize_indicator(kind, value)
+                if normalized:
+                    indicators[kind].add(normalized)
+
+    def _read_db(self, after: int, add) -> int:
+        """
+        Feeds trusted indicators with honeypot_run_indicators.id > `after` to
+        add(kind, value), in id order; returns the new cursor. Only rows past
+        `after` are read, never the whole runs table.
+        """
+        from sqlalchemy import and_, func, select
+
+        from database import SessionLocal
+        from models import HoneypotRun, RunIndicator
+
+        with SessionLocal() as db:
+            # Stop at what exists now, so rows that don't qualify aren't rescanned next tick
+            high = db.scalar(select(func.max(RunIndicator.id))) or 0
+            while after < high:
+                rows = db.execute(
+                    select(RunIndicator.id, RunIndicator.kind, RunIndicator.value)
+                    .join(HoneypotRun, and_(
+                        HoneypotRun.id == RunIndicator.run_id,
+                        HoneypotRun.timestamp == RunIndicator.timestamp,
+                    ))
+                    .where(
+                        RunIndicator.id > after,
+                        RunIndicator.id <= high,
+                        RunIndicator.kind.in_(KINDS),
+                        HoneypotRun.is_scam.is_(True),
+                        HoneypotRun.confidence >= BLOCKLIST_MIN_CONFIDENCE,
+                        HoneypotRun.scam_type != "known_bad_indicator",
+                    )
+                    .order_by(RunIndicator.id)
+                    .limit(BLOCKLIST_DB_BATCH)
+                ).all()
+                if len(rows) < BLOCKLIST_DB_BATCH:
+                    after = high
+                else:
+                    after = rows[-1][0]
+                for _, kind, value in rows:
+                    # Stored already normalized (analytics.normalize)
+                    add(kind, value)
+        return after
+
+    def reload(self):
+        """
+        Full rebuild: the file plus every trusted indicator in the DB.
+        """
+        indicators = {kind: set() for kind in KINDS}
+        cursor = 0
+        if self.path and os.path.exists(self.path):
+            self._file_mtime = os.path.getmtime(self.path)
+            self._read_file(indicators)
+        if self.from_db:
+            try:
+                cursor = self._read_db(0, lambda kind, value: indicators[kind].add(value))
+            except Exception as e:
+                print(f"⚠️ Blocklist DB load failed: {type(e).__name__}: {e}")
+        self._snapshot = _Snapshot(indicators)
+        self._db_cursor = cursor
+        self._rebuilt_at = time.monotonic()
+        self.reloads += 1
+        print(f"🛑 Blocklist loaded: {self._snapshot.count} indicators{' (bloom)' if self._snapshot.bloom else ''}")
+
+    def refresh_db(self):
+        """
+        Adds DB intel stored since the last read to the live snapshot. Starts
+        BLOCKLIST_DB_OVERLAP ids back, for rows committed after higher ids;
+        adding an indicator twice is a no-op.
+        """
+        snapshot = self._snapshot
+        before = snapshot.count
+        self._db_cursor = self._read_db(max(0, self._db_cursor - BLOCKLIST_DB_OVERLAP), snapshot.add)
+        if snapshot.full:
+            # Outgrew its set/Bloom sizing: rebuild at the right size
+            self.reload()
+        elif snapshot.count != before:
+            print(f"🛑 Blocklist +{snapshot.count - before} indicators from stored runs")
+
+    def _file_changed(self) -> bool:
+        if not self.path or not os.path.exists(self.path):
+            return False
+        return os.path.getmtime(self.path) != self._file_mtime
+
+    def _rebuild_due(self) -> bool:
+        return self.from_db and time.monotonic() - self._rebuilt_at >= BLOCKLIST_REBUILD_SECONDS
+
+    def _watch(self):
+        while not self._stop.wait(BLOCKLIST_RELOAD_SECONDS):
+            # File changes trigger a full rebuild; DB intel is read incrementally,
+            # with a periodic rebuild for commits that landed behind the overlap
+            try:
+                if self._file_changed() or self._rebuild_due():
+                    self.reload()
+                elif self.from_db:
+                    self.refresh_db()
+            except Exception as e:
+                print(f"⚠️ Blocklist reload failed: {type(e).__name__}: {e}")
+
+    def start(self):
+        if not self.path and not self.from_db:
+            return
+        self.reload()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="honeypot-blocklist", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "indicators": self._snapshot.count,
+            "bloom": self._snapshot.bloom,
+            "reloads": self.reloads,
+            "hits": dict(self.hits),
+        }
+
+
+blocklist = IndicatorIndex()
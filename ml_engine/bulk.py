@@ -0,0 +1,297 @@
+"""
+Offline bulk scoring for CSV / JSONL dumps (nightly backfills), no HTTP.
+
+    python -m ml_engine.bulk dump.jsonl -o scored.jsonl --workers 8
+    python -m ml_engine.bulk dump.csv -o scored_parquet/ --format parquet
+    python -m ml_engine.bulk dump.jsonl -o scored.jsonl --resume
+
+JSONL input is memory-mapped and split into newline-aligned byte ranges that
+the workers read themselves, so the parent never copies message text. CSV is
+streamed by the parent in record batches. Every worker process loads the
+model once (pool initializer). Output is written in input order and a
+checkpoint is saved after each chunk, so --resume continues after the last
+completed chunk.
+"""
+import os
+import csv
+import sys
+import json
+import mmap
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# Set per worker by _init_worker
+_detector = None
+_extractor = None
+_text_field = None
+
+
+def _init_worker(backend_name: str, text_field: str):
+    global _detector, _extractor, _text_field
+    from ml_engine.detector import ScamDetector
+    from ml_engine.extractor import extractor
+
+    _detector = ScamDetector(backend_name)
+    _detector.load()
+    _extractor = extractor
+    _text_field = text_field
+
+
+def _record_text(record):
+    """
+    Same tolerant field lookup as the API (MessageInput.unify_input).
+    """
+    if _text_field and isinstance(record, dict):
+        return str(record.get(_text_field) or ""), str(record.get("sender_id") or "unknown")
+    from schemas import MessageInput
+    try:
+        msg = MessageInput.model_validate(record)
+        return msg.message or "", msg.sender_id or "unknown"
+    except Exception:
+        return str(record), "unknown"
+
+
+def _score(first_record: int, records: list) -> list:
+    texts, senders = [], []
+    for record in records:
+        text, sender_id = _record_text(record)
+        texts.append(text)
+        senders.append(sender_id)
+
+    verdicts = _detector.predict_batch(texts)
+    intels = _extractor.extract_many(texts)
+    return [
+        {
+            "record": first_record + i,
+            "sender_id": senders[i],
+            "is_scam": verdict["is_scam"],
+            "scam_type": verdict["scam_type"],
+            "confidence": verdict["confidence"],
+            **intel,
+        }
+        for i, (verdict, intel) in enumerate(zip(verdicts, intels))
+    ]
+
+
+def _score_jsonl_range(path: str, start: int, end: int, first_record: int) -> list:
+    records = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # Records are "\n"-terminated, exactly as _count_lines counts them
+        lines = mm[start:end].split(b"\n")
+        if lines[-1] == b"":
+            lines.pop()
+        for line in lines:
+            line = line.rstrip(b"\r")
+            if not line.strip():
+                records.append("")
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                records.append(line.decode("utf-8", errors="replace"))
+    return _score(first_record, records)
+
+
+def _score_records(first_record: int, records: list) -> list:
+    return _score(first_record, records)
+
+
+# --- INPUT CHUNKING (parent process) ---
+def _count_lines(mm, start: int, end: int) -> int:
+    # find() scans the mapping in place; slicing would copy the chunk into the parent
+    lines = 0
+    pos = mm.find(b"\n", start, end)
+    while pos >= 0:
+        lines += 1
+        pos = mm.find(b"\n", pos + 1, end)
+    if end > start and mm[end - 1] != ord("\n"):
+        # Last line of the file without a trailing newline
+        lines += 1
+    return lines
+
+
+def _jsonl_chunks(path: str, chunk_bytes: int, offset: int, first_record: int):
+    size = os.path.getsize(path)
+    if size == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        while offset < size:
+            end = mm.find(b"\n", min(size, offset + chunk_bytes))
+            end = size if end < 0 else end + 1
+            lines = _count_lines(mm, offset, end)
+            yield {"offset": offset, "end": end, "record": first_record}, (_score_jsonl_range, path, offset, end, first_record)
+            offset, first_record = end, first_record + lines
+
+
+def _csv_chunks(path: str, chunk_records: int, first_record: int):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for _ in range(first_record):
+            if next(reader, None) is None:
+                return
+        while True:
+            batch = [row for _, row in zip(range(chunk_records), reader)]
+            if not batch:
+                return
+            yield {"record": first_record, "end_record": first_record + len(batch)}, (_score_records, first_record, batch)
+            first_record += len(batch)
+
+
+# --- OUTPUT ---
+class _JsonlSink:
+    def __init__(self, path: str, truncate_to: int):
+        mode = "r+b" if truncate_to and os.path.exists(path) else "wb"
+        self.f = open(path, mode)
+        if mode == "r+b":
+            self.f.truncate(truncate_to)
+            self.f.seek(truncate_to)
+
+    def write(self, chunk_index: int, rows: list) -> int:
+        self.f.write(b"".join(json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n" for row in rows))
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        return self.f.tell()
+
+    def close(self):
+        self.f.close()
+
+
+class _ParquetSink:
+    def __init__(self, path: str, truncate_to: int):
+        try:
+            import pandas as pd
+            import pyarrow  # noqa: F401  (pandas' parquet engine)
+        except ImportError:
+            raise SystemExit("Parquet output needs pandas and pyarrow installed (pip install pyarrow)")
+        self.pd = pd
+        self.dir = path
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, chunk_index: int, rows: list) -> int:
+        part = os.path.join(self.dir, f"part-{chunk_index:06d}.parquet")
+        tmp = part + ".tmp"
+        self.pd.DataFrame(rows).to_parquet(tmp, index=False)
+        os.replace(tmp, part)
+        return 0
+
+    def close(self):
+        pass
+
+
+# --- CHECKPOINT ---
+def _load_checkpoint(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_checkpoint(path: str, state: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def run(args) -> dict:
+    input_format = args.input_format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint.json"
+    state = {"chunks_done": 0, "records_done": 0, "offset": 0, "output_bytes": 0}
+
+    if args.resume:
+        saved = _load_checkpoint(checkpoint_path)
+        if saved:
+            if saved.get("input") != os.path.abspath(args.input):
+                raise SystemExit(f"Checkpoint {checkpoint_path} belongs to {saved.get('input')}")
+            state.update(saved)
+            print(f"↩️  Resuming after chunk {state['chunks_done']} ({state['records_done']} records)", file=sys.stderr)
+
+    state.update({"input": os.path.abspath(args.input), "output": os.path.abspath(args.output)})
+
+    if input_format == "csv":
+        chunks = _csv_chunks(args.input, args.chunk_records, state["records_done"])
+    else:
+        chunks = _jsonl_chunks(args.input, args.chunk_mb * 1024 * 1024, state["offset"], state["records_done"])
+
+    sink_cls = _ParquetSink if args.format == "parquet" else _JsonlSink
+    sink = sink_cls(args.output, state["output_bytes"] if args.resume else 0)
+
+    total_bytes = os.path.getsize(args.input)
+    started = time.monotonic()
+    scored_now = 0
+    workers = args.workers or os.cpu_count() or 1
+    max_inflight = workers * 2
+    chunk_index = state["chunks_done"]
+
+    def _commit(meta, rows):
+        nonlocal chunk_index, scored_now
+        output_bytes = sink.write(chunk_index, rows)
+        chunk_index += 1
+        scored_now += len(rows)
+        state.update({
+            "chunks_done": chunk_index,
+            "records_done": meta["record"] + len(rows),
+            "offset": meta.get("end", state["offset"]),
+            "output_bytes": output_bytes,
+        })
+        _save_checkpoint(checkpoint_path, state)
+        elapsed = time.monotonic() - started
+        progress = f" {state['offset'] / total_bytes:6.1%}" if input_format == "jsonl" and total_bytes else ""
+        print(
+            f"📦 chunk {chunk_index}: {state['records_done']} records{progress}, "
+            f"{scored_now / elapsed if elapsed else 0:,.0f} rec/s",
+            file=sys.stderr,
+        )
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(args.backend, args.text_field),
+        ) as pool:
+            # Bounded window of in-flight chunks, committed strictly in order
+            inflight = []
+            for meta, (fn, *fn_args) in chunks:
+                inflight.append((meta, pool.submit(fn, *fn_args)))
+                if len(inflight) >= max_inflight:
+                    meta0, future = inflight.pop(0)
+                    _commit(meta0, future.result())
+            for meta, future in inflight:
+                _commit(meta, future.result())
+    finally:
+        sink.close()
+
+    elapsed = time.monotonic() - started
+    summary = {
+        "records_scored": scored_now,
+        "records_total": state["records_done"],
+        "chunks": chunk_index,
+        "seconds": round(elapsed, 2),
+        "records_per_sec": round(scored_now / elapsed, 1) if elapsed else None,
+        "workers": workers,
+    }
+    print(json.dumps(summary), file=sys.stderr)
+    return summary
+
+
+def main(argv=None):
+    from ml_engine.detector import BACKEND_NAME
+
+    parser = argparse.ArgumentParser(description="Score CSV/JSONL message dumps offline on all cores")
+    parser.add_argument("input", help="input .jsonl or .csv file")
+    parser.add_argument("-o", "--output", required=True, help="output .jsonl file, or directory for parquet parts")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--input-format", choices=["jsonl", "csv"], help="default: from file extension")
+    parser.add_argument("--text-field", help="field holding the message (default: same lookup as the API)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-mb", type=int, default=4, help="JSONL chunk size in MB")
+    parser.add_argument("--chunk-records", type=int, default=20000, help="CSV records per chunk")
+    parser.add_argument("--backend", default=BACKEND_NAME, help="detector backend")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint.json)")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+
+# Campaign templates differ only in names, amounts, links and handles.
+# Masking those makes every copy of a template shingle the same (campaigns.py).
+_URL_RE = re.compile(r"https?://\S+|www\.\S+", re.IGNORECASE)
+_UPI_RE = re.compile(r"[\w.\-]{2,256}@[a-z]{2,64}", re.IGNORECASE)
+_DIGITS_RE = re.compile(r"\d+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """
+    Canonical form of a message: case-folded, URLs/UPI handles/digit runs masked,
+    whitespace collapsed.
+    """
+    text = message.casefold()
+    text = _URL_RE.sub(" <url> ", text)
+    text = _UPI_RE.sub(" <upi> ", text)
+    text = _DIGITS_RE.sub("0", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def canonical_text(message: str) -> str:
+    """
+    What the detector actually scores, and its cache key: lower-cased, digit
+    runs masked, whitespace collapsed. Hosts and UPI handles stay, since the
+    rules and the model read them; the verdict is a function of this string
+    alone, so messages sharing a key can't get different verdicts.
+    """
+    text = _DIGITS_RE.sub("0", message.lower())
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+class VerdictCache:
+    """
+    Thread-safe bounded LRU with a per-entry TTL.
+    max_size <= 0 disables caching entirely.
+
+    `generation` moves on every clear(). A writer that read it before computing
+    its value passes it to put(), which drops the write if a clear() happened
+    in between; the check and the write share the lock with clear().
+    """
+
+    def __init__(self, max_size: int = 50000, ttl_seconds: float = 3600.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value, generation: int = None) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def verdict_cache_from_env() -> VerdictCache:
+    return VerdictCache(
+        max_size=int(os.getenv("HONEYPOT_VERDICT_CACHE_SIZE", "50000")),
+        ttl_seconds=float(os.getenv("HONEYPOT_VERDICT_CACHE_TTL", "3600")),
+    )
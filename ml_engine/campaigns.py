@@ -0,0 +1,180 @@
+import os
+import time
+import uuid
+import zlib
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from ml_engine.cache import normalize_message
+
+# --- CONFIG ---
+# 16 bands x 4 rows: two messages land in the same bucket with ~64% odds at
+# Jaccard 0.5 and ~99% at 0.7, which is where template mutations sit.
+NUM_BANDS = int(os.getenv("HONEYPOT_CAMPAIGN_BANDS", "16"))
+ROWS_PER_BAND = int(os.getenv("HONEYPOT_CAMPAIGN_ROWS", "4"))
+MAX_CAMPAIGNS = int(os.getenv("HONEYPOT_CAMPAIGN_MAX", "20000"))
+MAX_MEMBERS_KEPT = int(os.getenv("HONEYPOT_CAMPAIGN_MEMBERS", "200"))
+MAX_INDICATORS_KEPT = int(os.getenv("HONEYPOT_CAMPAIGN_INDICATORS", "500"))
+SHINGLE_WORDS = 3
+# The first members' band keys are indexed too, so later mutations can match
+# any early variant, not just the founding message
+INDEXED_MEMBERS = int(os.getenv("HONEYPOT_CAMPAIGN_INDEXED_MEMBERS", "16"))
+
+_PRIME = np.uint64((1 << 61) - 1)
+_INTEL_KEYS = ("upi_ids", "phone_numbers", "phishing_links", "bank_accounts")
+
+
+def shingles(message: str) -> set:
+    """
+    Word 3-grams of the normalized message (digits/URLs/UPI handles masked,
+    so amounts and links don't split a campaign).
+    """
+    words = normalize_message(message).split()
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+class MinHasher:
+    def __init__(self, num_perm: int, seed: int = 7):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, items: set) -> np.ndarray:
+        hashes = np.fromiter(
+            (zlib.crc32(item.encode("utf-8")) for item in items), dtype=np.uint64, count=len(items)
+        )
+        # (a*x + b) mod p for every permutation x shingle, min over shingles
+        return ((np.outer(self.a, hashes) + self.b[:, None]) % _PRIME).min(axis=1)
+
+
+class _Campaign:
+    __slots__ = ("id", "first_seen", "last_seen", "size", "members", "indicators", "bands", "sample")
+
+    def __init__(self, campaign_id: str, sample: str):
+        now = time.time()
+        self.id = campaign_id
+        self.first_seen = now
+        self.last_seen = now
+        self.size = 0
+        self.members = deque(maxlen=MAX_MEMBERS_KEPT)
+        # Ordered sets (dict keys), capped per kind
+        self.indicators = {key: {} for key in _INTEL_KEYS}
+        # (band, key) pairs this campaign owns in the LSH buckets
+        self.bands = []
+        self.sample = sample[:280]
+
+    def to_dict(self, with_members: bool = False) -> dict:
+        data = {
+            "campaign_id": self.id,
+            "size": self.size,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "sample_message": self.sample,
+            "indicators": {key: list(values) for key, values in self.indicators.items()},
+        }
+        if with_members:
+            data["recent_members"] = list(self.members)
+        return data
+
+
+class CampaignIndex:
+    """
+    In-memory MinHash/LSH index of scam campaigns.
+
+    add() is O(bands): one signature, one dict probe per band. Campaigns are
+    kept in LRU order and the least recently seen is evicted (with its bucket
+    entries) once MAX_CAMPAIGNS is reached.
+    """
+
+    def __init__(self, num_bands: int = NUM_BANDS, rows_per_band: int = ROWS_PER_BAND, max_campaigns: int = MAX_CAMPAIGNS):
+        self.num_bands = num_bands
+        self.rows = rows_per_band
+        self.max_campaigns = max_campaigns
+        self.hasher = MinHasher(num_bands * rows_per_band)
+        self._buckets = [dict() for _ in range(num_bands)]
+        self._campaigns = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _band_keys(self, signature: np.ndarray) -> list:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.num_bands)]
+
+    def add(self, message: str, intel: dict = None, member_id: str = None):
+        """
+        Assigns the message to a campaign (creating one if nothing is close)
+        and links its extracted indicators. Returns the campaign id.
+        """
+        items = shingles(message)
+        if not items:
+            return None
+        signature = self.hasher.signature(items)
+        keys = self._band_keys(signature)
+
+        with self._lock:
+            campaign = None
+            for band, key in enumerate(keys):
+                campaign_id = self._buckets[band].get(key)
+                if campaign_id is not None and campaign_id in self._campaigns:
+                    campaign = self._campaigns[campaign_id]
+                    break
+
+            if campaign is None:
+                campaign = _Campaign(f"cmp_{uuid.uuid4().hex[:10]}", message)
+                self._campaigns[campaign.id] = campaign
+                for band, key in enumerate(keys):
+                    if self._buckets[band].setdefault(key, campaign.id) == campaign.id:
+                        campaign.bands.append((band, key))
+                self._evict()
+            else:
+                self._campaigns.move_to_end(campaign.id)
+                if campaign.size < INDEXED_MEMBERS:
+                    for band, key in enumerate(keys):
+                        if self._buckets[band].setdefault(key, campaign.id) == campaign.id:
+                            campaign.bands.append((band, key))
+
+            campaign.size += 1
+            campaign.last_seen = time.time()
+            if member_id:
+                campaign.members.append(member_id)
+            for key in _INTEL_KEYS:
+                bucket = campaign.indicators[key]
+                for value in (intel or {}).get(key, ()):
+                    if len(bucket) >= MAX_INDICATORS_KEPT:
+                        break
+                    bucket[value] = None
+            return campaign.id
+
+    def _evict(self):
+        while len(self._campaigns) > self.max_campaigns:
+            _, old = self._campaigns.popitem(last=False)
+            for band, key in old.bands:
+                if self._buckets[band].get(key) == old.id:
+                    del self._buckets[band][key]
+            self.evictions += 1
+
+    # --- QUERY ---
+    def get(self, campaign_id: str):
+        with self._lock:
+            campaign = self._campaigns.get(campaign_id)
+            return campaign.to_dict(with_members=True) if campaign else None
+
+    def top(self, limit: int = 50) -> list:
+        with self._lock:
+            campaigns = sorted(self._campaigns.values(), key=lambda c: (c.size, c.last_seen), reverse=True)
+            return [campaign.to_dict() for campaign in campaigns[:limit]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "campaigns": len(self._campaigns),
+                "max_campaigns": self.max_campaigns,
+                "evictions": self.evictions,
+            }
+
+
+campaigns = CampaignIndex()
@@ -0,0 +1,302 @@
+import os
+import json
+import time
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+
+from ml_engine.personas import PersonaState, personas
+
+# --- CONFIG ---
+# Turns kept per conversation (one turn = one scammer message or one reply)
+MAX_TURNS = int(os.getenv("HONEYPOT_CONVERSATION_TURNS", "12"))
+MAX_TURN_CHARS = int(os.getenv("HONEYPOT_CONVERSATION_TURN_CHARS", "500"))
+# Idle conversations are evicted (and spilled, if enabled) after this many seconds
+CONVERSATION_TTL = float(os.getenv("HONEYPOT_CONVERSATION_TTL", "1800"))
+# Global cap on the estimated size of everything held in memory
+MAX_BYTES = int(os.getenv("HONEYPOT_CONVERSATION_MAX_BYTES", str(64 * 1024 * 1024)))
+# Token budget for the history handed to the LLM (system prompt not included)
+HISTORY_TOKENS = int(os.getenv("HONEYPOT_HISTORY_TOKENS", "400"))
+# SQLite file for evicted conversations; empty disables spilling
+SPILL_DB = os.getenv("HONEYPOT_CONVERSATION_SPILL_DB", "")
+
+# Rough per-object overheads so the byte cap tracks real heap use
+_TURN_OVERHEAD = 120
+_CONVERSATION_OVERHEAD = 600
+# Sender ids that can't tell senders apart: no conversation, no per-sender limit
+ANONYMOUS_SENDERS = {None, "", "unknown"}
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 chars per token for English/Hinglish, plus per-message framing
+    return len(text) // 4 + 4
+
+
+class _Conversation:
+    __slots__ = ("sender_id", "turns", "started_at", "last_seen", "messages_received", "bytes", "persona")
+
+    def __init__(self, sender_id: str, started_at: float = None):
+        now = time.time()
+        self.sender_id = sender_id
+        self.turns = deque(maxlen=MAX_TURNS)
+        self.started_at = started_at or now
+        self.last_seen = now
+        self.messages_received = 0
+        self.bytes = _CONVERSATION_OVERHEAD
+        self.persona = personas.new_state(sender_id)
+
+    def append(self, role: str, text: str) -> int:
+        """
+        Adds a turn, returns the change in estimated bytes.
+        """
+        text = text[:MAX_TURN_CHARS]
+        delta = len(text) + _TURN_OVERHEAD
+        if len(self.turns) == self.turns.maxlen:
+            delta -= len(self.turns[0][1]) + _TURN_OVERHEAD
+        self.turns.append((role, text))
+        self.bytes += delta
+        return delta
+
+    def metrics(self) -> dict:
+        return {
+            "messages_exchanged": self.messages_received,
+            "duration_seconds": int(self.last_seen - self.started_at),
+            "personas_tried": self.persona.tried,
+            "persona": personas.name(self.persona),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "turns": list(self.turns),
+            "started_at": self.started_at,
+            "last_seen": self.last_seen,
+            "messages_received": self.messages_received,
+            "persona": self.persona.to_list(),
+        })
+
+    @classmethod
+    def from_json(cls, sender_id: str, payload: str):
+        data = json.loads(payload)
+        conversation = cls(sender_id, data["started_at"])
+        for role, text in data["turns"]:
+            conversation.append(role, text)
+        conversation.messages_received = data["messages_received"]
+        if "persona" in data:
+            conversation.persona = PersonaState.from_list(data["persona"])
+        return conversation
+
+
+class _SqliteSpill:
+    """
+    Idle conversations parked on disk. Writes go through a queue drained by a
+    background thread; rows still waiting in it are served from _pending.
+    Open it in the process that uses it (after any fork).
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations (sender_id TEXT PRIMARY KEY, payload TEXT, last_seen REAL)"
+        )
+        self._db_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self.spilled = 0
+        self.restored = 0
+        self._thread = threading.Thread(target=self._run, name="honeypot-conversation-spill", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 10.0):
+        # Drain what is queued, then let the writer exit
+        self._queue.put(None)
+        self._thread.join(timeout)
+        with self._db_lock:
+            self._conn.close()
+
+    def put(self, conversation: _Conversation):
+        with self._pending_lock:
+            self._pending[conversation.sender_id] = conversation
+        self._queue.put(conversation.sender_id)
+
+    def take(self, sender_id: str):
+        with self._pending_lock:
+            conversation = self._pending.pop(sender_id, None)
+        if conversation is not None:
+            self.restored += 1
+            return conversation
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT payload FROM conversations WHERE sender_id = ?", (sender_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM conversations WHERE sender_id = ?", (sender_id,))
+        self.restored += 1
+        return _Conversation.from_json(sender_id, row[0])
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < 500:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+                batch = [sender_id for sender_id in batch if sender_id is not None]
+            with self._pending_lock:
+                parked = {s: self._pending[s] for s in batch if s in self._pending}
+                rows = [(s, c.to_json(), c.last_seen) for s, c in parked.items()]
+            try:
+                with self._db_lock:
+                    self._conn.executemany("INSERT OR REPLACE INTO conversations VALUES (?, ?, ?)", rows)
+                self.spilled += len(rows)
+            except sqlite3.Error as e:
+                print(f"⚠️ Conversation spill failed: {e}")
+            with self._pending_lock:
+                for sender_id, conversation in parked.items():
+                    # Leave it if it was restored and parked again meanwhile
+                    if self._pending.get(sender_id) is conversation:
+                        del self._pending[sender_id]
+
+
+class ConversationStore:
+    """
+    Per-sender conversation history for the agent.
+
+    Each conversation is a fixed-size ring of turns; conversations are kept in
+    LRU order, so TTL expiry and the global byte cap both evict from the head.
+    Every operation is O(1) amortized (the ring and the history trim are
+    bounded by MAX_TURNS).
+
+    With spill_db set, evicted conversations are parked in SQLite once
+    start() has run (from the app lifespan, so in each worker rather than a
+    preloading master). Restoring one is a disk read, so callers on an event
+    loop should run context() in a thread when `spills` is true.
+    """
+
+    def __init__(self, ttl: float = CONVERSATION_TTL, max_bytes: int = MAX_BYTES, spill_db: str = SPILL_DB):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+        self.spill_db = spill_db
+        self._spill = None
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _evict_locked(self, now: float):
+        while self._conversations:
+            sender_id, oldest = next(iter(self._conversations.items()))
+            expired = now - oldest.last_seen > self.ttl
+            if not expired and self.bytes <= self.max_bytes:
+                return
+            del self._conversations[sender_id]
+            self.bytes -= oldest.bytes
+            if expired:
+                self.expirations += 1
+            else:
+                self.evictions += 1
+            if self._spill:
+                self._spill.put(oldest)
+
+    @property
+    def spills(self) -> bool:
+        return self._spill is not None
+
+    def start(self):
+        if self.spill_db and self._spill is None:
+            self._spill = _SqliteSpill(self.spill_db)
+
+    def stop(self):
+        spill, self._spill = self._spill, None
+        if spill:
+            spill.close()
+
+    def _get_locked(self, sender_id: str, create: bool, restored: _Conversation = None):
+        conversation = self._conversations.get(sender_id)
+        if conversation is not None:
+            self._conversations.move_to_end(sender_id)
+            return conversation
+        conversation = restored
+        if conversation is None and create:
+            conversation = _Conversation(sender_id)
+        if conversation is not None:
+            self._conversations[sender_id] = conversation
+            self.bytes += conversation.bytes
+        return conversation
+
+    def _get(self, sender_id: str):
+        with self._lock:
+            conversation = self._get_locked(sender_id, create=False)
+        spill = self._spill
+        if conversation is not None or spill is None:
+            return conversation
+        # Disk read outside the store lock; other senders aren't held up by it
+        restored = spill.take(sender_id)
+        with self._lock:
+            return self._get_locked(sender_id, create=False, restored=restored)
+
+    def context(self, sender_id: str, token_budget: int = HISTORY_TOKENS):
+        """
+        (PersonaState, history) for the sender's next reply, starting the
+        conversation if needed; (None, []) for anonymous senders. History is
+        the most recent turns that fit in token_budget, oldest first, as chat
+        messages.
+        """
+        if sender_id in ANONYMOUS_SENDERS:
+            return None, []
+        self._get(sender_id)
+        with self._lock:
+            conversation = self._get_locked(sender_id, create=True)
+            kept = []
+            for role, text in reversed(conversation.turns):
+                token_budget -= estimate_tokens(text)
+                if token_budget < 0:
+                    break
+                kept.append({"role": role, "content": text})
+        kept.reverse()
+        return conversation.persona, kept
+
+    def record(self, sender_id: str, message: str, reply: str = None):
+        """
+        Appends the scammer's message (and our reply) and returns the
+        conversation's engagement metrics, or None for anonymous senders.
+        Never touches the spill: call context() first.
+        """
+        if sender_id in ANONYMOUS_SENDERS:
+            return None
+        now = time.time()
+        with self._lock:
+            conversation = self._get_locked(sender_id, create=True)
+            delta = conversation.append("user", message)
+            if reply:
+                delta += conversation.append("assistant", reply)
+            conversation.messages_received += 1
+            conversation.last_seen = now
+            self.bytes += delta
+            self._evict_locked(now)
+            return conversation.metrics()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {
+                "conversations": len(self._conversations),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+        if self._spill:
+            stats["spilled"] = self._spill.spilled
+            stats["restored"] = self._spill.restored
+        return stats
+
+
+conversations = ConversationStore()
@@ -1,88 +1,296 @@
-import pandas as pd
-import numpy as np
 import joblib
 import os
-import re
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.pipeline import Pipeline
+import json
+import time
+import tempfile
+import threading
+from ml_engine.backends import MODEL_DIR, get_backend, load_labeled
+from ml_engine.cache import canonical_text, verdict_cache_from_env
+from ml_engine.rules import RuleEngine
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Which inference backend serves this deployment (see ml_engine/backends.py)
+BACKEND_NAME = os.getenv("HONEYPOT_DETECTOR_BACKEND", "random_forest")
+MODEL_PATH = os.getenv("HONEYPOT_MODEL_PATH", get_backend(BACKEND_NAME).artifact_path())
+# Memory-map numpy arrays in the artifact instead of copying them into each worker
+MODEL_MMAP = os.getenv("HONEYPOT_MODEL_MMAP", "1") == "1"
+# Retrained artifacts: <dir>/<backend>/<version>.pkl plus a <backend>.current.json pointer
+VERSIONS_DIR = os.getenv("HONEYPOT_MODEL_VERSIONS_DIR", os.path.join(MODEL_DIR, "versions"))
+# How often serving workers check the pointer for a newer version
+MODEL_RELOAD_SECONDS = float(os.getenv("HONEYPOT_MODEL_RELOAD", "10"))
+
+
+def atomic_dump(obj, path: str):
+    """
+    joblib.dump to a temp file in the same directory, then rename over `path`.
+    Readers see either the old file or the complete new one, never a torn write.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".pkl", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            joblib.dump(obj, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _atomic_write_text(text: str, path: str):
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def current_pointer_path(backend_name: str) -> str:
+    return os.path.join(VERSIONS_DIR, f"{backend_name}.current.json")
+
+
+def read_current(backend_name: str):
+    """
+    The published {"version", "path"} for a backend, or None before the first retrain.
+    """
+    try:
+        with open(current_pointer_path(backend_name), encoding="utf-8") as f:
+            pointer = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return pointer if os.path.exists(pointer.get("path", "")) else None
+
+
+def publish_version(model, backend_name: str, **info) -> dict:
+    """
+    Writes the model as a new immutable versioned artifact, then flips the
+    backend's pointer to it. Serving processes pick it up on their next poll.
+    """
+    version = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+    directory = os.path.join(VERSIONS_DIR, backend_name)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{version}.pkl")
+    suffix = 1
+    while os.path.exists(path):
+        # Two publishes within the same second
+        suffix += 1
+        path = os.path.join(directory, f"{version}-{suffix}.pkl")
+    version = os.path.basename(path)[:-4]
+    atomic_dump(model, path)
+    pointer = {"version": version, "path": path, "published_at": time.time(), **info}
+    _atomic_write_text(json.dumps(pointer), current_pointer_path(backend_name))
+    return pointer
 
-MODEL_PATH = "ml_engine/scam_model.pkl"
 
 class ScamDetector:
-    def __init__(self):
-        self.model = None
-        self._load_or_train_model()
+    def __init__(self, backend_name: str = BACKEND_NAME, model_path: str = None):
+        self.backend = get_backend(backend_name)
+        self.model_path = model_path or (MODEL_PATH if backend_name == BACKEND_NAME else self.backend.artifact_path())
+        # An explicit artifact pins the model; otherwise follow published versions
+        self.follow_versions = model_path is None
+        self.cache = verdict_cache_from_env()
+        self.rules = RuleEngine.from_file()
+        self.version = None
+        # Last failed load, surfaced by /ready; cleared by the next good load
+        self.load_error = None
+        self._model = None
+        self._generation = 0
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def model(self):
+        # Lazy: the artifact is only read on first use (or by an explicit load())
+        if self._model is None:
+            self.load()
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        # Cached verdicts belong to the old model; drop them on every swap.
+        # Assign first: clear() bumps the cache generation, so a prediction that
+        # may have used the old model can no longer write its verdict back.
+        self._model = model
+        self._generation += 1
+        self.cache.clear()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self):
+        """
+        Loads the model once. Safe to call from several threads; call it in a
+        preloading master to share the model copy-on-write with forked workers.
+        """
+        with self._load_lock:
+            if self._model is None:
+                try:
+                    self._load_or_train_model()
+                except Exception as e:
+                    self.load_error = f"{type(e).__name__}: {e}"
+                    raise
+                self.load_error = None
+        return self._model
 
     def _load_or_train_model(self):
-        if os.path.exists(MODEL_PATH):
-            self.model = joblib.load(MODEL_PATH)
-            print("✅ Loaded trained Scam Model.")
-        else:
-            print("⚠️ No model found. Training a baseline model now...")
-            self._train_baseline_model()
+        pointer = read_current(self.backend.name) if self.follow_versions else None
+        if pointer:
+            self.swap(joblib.load(pointer["path"], mmap_mode="r" if MODEL_MMAP else None), pointer["version"])
+            print(f"✅ Loaded trained Scam Model ({self.backend.name}, {self.version}).")
+            return
+        if not os.path.exists(self.model_path):
+            self._train_with_file_lock()
+        if self._model is None:
+            self.version = "baseline"
+            self.model = joblib.load(self.model_path, mmap_mode="r" if MODEL_MMAP else None)
+            print(f"✅ Loaded trained Scam Model ({self.backend.name}).")
+
+    def swap(self, model, version: str):
+        """
+        Atomic hot swap: in-flight predictions finish on the model reference
+        they already hold, the next one sees the new model.
+        """
+        self.version = version
+        self.model = model
+
+    def reload_if_changed(self) -> bool:
+        pointer = read_current(self.backend.name)
+        if not pointer or pointer["version"] == self.version:
+            return False
+        # Load fully before swapping; serving never waits on this
+        model = joblib.load(pointer["path"], mmap_mode="r" if MODEL_MMAP else None)
+        self.swap(model, pointer["version"])
+        print(f"🔁 Hot-swapped Scam Model ({self.backend.name}) to {self.version}")
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(MODEL_RELOAD_SECONDS):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                print(f"⚠️ Model reload failed: {type(e).__name__}: {e}")
+
+    def start_watcher(self):
+        if not self.follow_versions or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="honeypot-model-watch", daemon=True)
+        self._thread.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        self._thread = None
+
+    def _train_with_file_lock(self):
+        # Several workers may start without an artifact; only one of them trains
+        lock_file = open(self.model_path + ".lock", "w") if fcntl else None
+        try:
+            if lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if not os.path.exists(self.model_path):
+                print("⚠️ No model found. Training a baseline model now...")
+                self._train_baseline_model()
+        finally:
+            if lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
 
     def _train_baseline_model(self):
-        data = [
-            ("Your account is locked. Verify KYC now.", 1),
-            ("Click this link to update your PAN card.", 1),
-            ("You have won a lottery! Claim prize.", 1),
-            ("Hey, are we still meeting for lunch?", 0),
-            ("Your OTP is 1234.", 0)
-        ]
-        df = pd.DataFrame(data, columns=["text", "label"])
-        self.model = Pipeline([
-            ('tfidf', TfidfVectorizer(ngram_range=(1, 2))),
-            ('clf', RandomForestClassifier(n_estimators=100))
-        ])
-        self.model.fit(df['text'], df['label'])
-        joblib.dump(self.model, MODEL_PATH)
+        texts, labels = load_labeled()
+        model = self.backend.train(texts, labels)
+        atomic_dump(model, self.model_path)
+        self.version = "baseline"
+        self.model = model
 
     def predict(self, message: str):
         # 🛡️ SAFETY CHECK: Handle empty inputs
         if not message or not isinstance(message, str):
-            return {
-                "is_scam": False,
-                "confidence": 0.0,
-                "scam_type": "unknown_or_empty"
-            }
-
-        # 1. Heuristic Check
-        red_flags = [
-            r"kyc", r"verify", r"block", r"suspend", r"lottery", 
-            r"winner", r"claim", r"urgent", r"disconnect"
-        ]
-        heuristic_score = 0
-        for pattern in red_flags:
-            if re.search(pattern, message.lower()):
-                heuristic_score += 0.2
-        
-        # 2. ML Prediction
+            return self._empty_verdict()
+
+        # Score the key itself, so the cached verdict depends on nothing else
+        key = canonical_text(message)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        # Read before the model: a swap after this point makes put() a no-op
+        generation = self.cache.generation
+        # Outside the try: a model that can't be loaded fails the request
+        # instead of scoring everything as ml_prob=0.0
+        model = self.model
+
+        # ML Prediction
         try:
-            ml_prob = self.model.predict_proba([message])[0][1]
+            ml_prob = model.predict_proba([key])[0][1]
         except:
             ml_prob = 0.0 # Safety net if ML fails on weird chars
-        
-        # 3. Ensemble Score
-        final_score = min(1.0, (ml_prob * 0.7) + (heuristic_score * 0.3))
-        is_scam = final_score > 0.5
-        
-        # Determine Type
-        scam_type = "clean"
-        if is_scam:
-            if "kyc" in message.lower() or "pan" in message.lower():
-                scam_type = "kyc_phishing"
-            elif "winner" in message.lower():
-                scam_type = "lottery_scam"
-            elif "bill" in message.lower():
-                scam_type = "utility_scam"
+
+        verdict = self._score(key, ml_prob)
+        self.cache.put(key, verdict, generation)
+        return dict(verdict)
+
+    def predict_batch(self, messages: list) -> list:
+        """
+        Scores a whole batch with a single vectorizer/classifier pass.
+        Returns one verdict dict per input, in order.
+        """
+        verdicts = [None] * len(messages)
+        # normalized key -> indices still needing a model pass
+        pending = {}
+        for i, message in enumerate(messages):
+            if not message or not isinstance(message, str):
+                verdicts[i] = self._empty_verdict()
+                continue
+            key = canonical_text(message)
+            if key in pending:
+                pending[key].append(i)
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                verdicts[i] = dict(cached)
             else:
-                scam_type = "general_phishing"
+                pending[key] = [i]
 
+        if not pending:
+            return verdicts
+
+        keys = list(pending)
+        generation = self.cache.generation
+        model = self.model
+        try:
+            probs = model.predict_proba(keys)[:, 1]
+        except Exception:
+            # One bad item must not sink the batch: fall back to per-item scoring
+            for key in keys:
+                for i in pending[key]:
+                    verdicts[i] = self.predict(messages[i])
+            return verdicts
+
+        for key, prob in zip(keys, probs):
+            verdict = self._score(key, prob)
+            self.cache.put(key, verdict, generation)
+            for i in pending[key]:
+                verdicts[i] = dict(verdict)
+        return verdicts
+
+    @staticmethod
+    def _empty_verdict():
         return {
-            "is_scam": bool(is_scam),
-            "confidence": float(round(final_score, 4)),
-            "scam_type": scam_type
+            "is_scam": False,
+            "confidence": 0.0,
+            "scam_type": "unknown_or_empty"
         }
 
+    def _score(self, message: str, ml_prob: float):
+        # Heuristics + scam type from the compiled rule set (ml_engine/data/rules.json)
+        return self.rules.score(message, ml_prob)
+
 detector = ScamDetector()
\ No newline at end of file
@@ -1,5 +1,10 @@
+import os
 import re
 
+# Anything past this is ignored; keeps a multi-megabyte paste from dominating a worker
+MAX_SCAN_CHARS = int(os.getenv("HONEYPOT_EXTRACT_MAX_CHARS", "100000"))
+MAX_URL_CHARS = 2048
+
 class IntelligenceExtractor:
     def __init__(self):
         # Regex patterns specifically tuned for Indian banking context
@@ -20,11 +25,29 @@ class IntelligenceExtractor:
             "ifsc": r"[A-Z]{4}0[A-Z0-9]{6}"
         }
 
-    def extract(self, text: str) -> dict:
-        """
-        Scans text and returns unique extracted entities in a dictionary.
-        """
-        intelligence = {
+        # Single-pass scanner. Every alternative consumes a whole token, so the
+        # engine never re-tries from inside a word (no quadratic backtracking);
+        # digit runs are read once and classified as phone/account in Python.
+        # A word stops in front of "http(s)://" so a URL glued to the previous
+        # token ("now.https://...") is still found.
+        word = (
+            r"(?P<prefix>\+91[\-\s]?)?(?P<word>(?:[a-gi-zA-Z0-9.\-_]|h(?!ttps?://))+)"
+            r"(?:@(?P<domain>[a-zA-Z]{2,64}))?"
+        )
+        self.scanner = re.compile(
+            r"(?P<url>https?://(?:[-\w.]|%[\da-fA-F]{2})\S{0," + str(MAX_URL_CHARS) + r"})|" + word
+        )
+        # Tokens inside a URL (user@host handles, numbers in the path or query)
+        self.url_words = re.compile(word)
+        # '_' is a word character, so like the old \b-bounded account pattern
+        # it doesn't separate a number from the text around it
+        self.part_splitter = re.compile(r"[.\-]+")
+        self.digit_runs = re.compile(r"[0-9]{10,}")
+        self.ifsc = re.compile(self.patterns["ifsc"])
+
+    @staticmethod
+    def _empty() -> dict:
+        return {
             "upi_ids": [],
             "phishing_links": [],
             "phone_numbers": [],
@@ -32,31 +55,92 @@ class IntelligenceExtractor:
             "ifsc_codes": []
         }
 
-        # 1. Extract UPI IDs
-        intelligence["upi_ids"] = list(set(re.findall(self.patterns["upi_id"], text)))
+    @staticmethod
+    def _as_phone(digits: str):
+        # 10 digits starting 6-9, optionally with a trunk '0' or country '91' in front
+        if len(digits) == 11 and digits[0] == "0":
+            digits = digits[1:]
+        elif len(digits) == 12 and digits.startswith("91"):
+            digits = digits[2:]
+        if len(digits) == 10 and digits[0] in "6789":
+            return digits
+        return None
 
-        # 2. Extract URLs
-        intelligence["phishing_links"] = list(set(re.findall(self.patterns["url"], text)))
+    def _classify(self, match, found):
+        """
+        Files one word token (optionally +91-prefixed or @handle) into the
+        upi/phone/account/ifsc ordered sets.
+        """
+        upi_ids, phones, accounts, ifsc_codes = found
+        word = match.group("word")
+        prefix = match.group("prefix")
 
-        # 3. Extract Phone Numbers
-        intelligence["phone_numbers"] = list(set(re.findall(self.patterns["phone_number"], text)))
-        
-        # 4. Extract Potential Bank Accounts
-        # We perform a filter to avoid confusing phone numbers (10 digits) with accounts
-        raw_numbers = re.findall(self.patterns["bank_account"], text)
-        clean_accounts = []
-        for num in raw_numbers:
-            # Simple heuristic: Accounts usually aren't exactly 10 digits (phones are)
-            # Unless they are specifically labeled as accounts (context checking is advanced/next-step)
-            if len(num) != 10:
-                clean_accounts.append(num)
-        
-        intelligence["bank_accounts"] = list(set(clean_accounts))
+        # 1. UPI IDs (name@bank); the handle's digits are still read below
+        domain = match.group("domain")
+        if domain:
+            # "+91" (or "+91-") directly in front is part of the handle
+            local = (prefix[1:] if prefix and not prefix[-1].isspace() else "") + word
+            local = local[-256:]
+            if len(local) >= 2:
+                upi_ids[f"{local}@{domain}"] = None
 
-        # 5. Extract IFSC
-        intelligence["ifsc_codes"] = list(set(re.findall(self.patterns["ifsc"], text)))
+        for part in self.part_splitter.split(word):
+            if part.isdigit():
+                # 2. Phone Numbers (a '+91' prefix only belongs to the first part)
+                phone = self._as_phone(part)
+                if phone:
+                    phones[prefix + phone if prefix else phone] = None
+                # 3. Potential Bank Accounts, read as written ("+919876543210" -> 919876543210)
+                # Accounts usually aren't exactly 10 digits (phones are)
+                number = "91" + part if prefix == "+91" else part
+                if 9 <= len(number) <= 18 and len(number) != 10:
+                    accounts[number] = None
+            elif len(part) >= 10:
+                # Phones run into letters ("abc9876543210", "id_9876543210")
+                for digits in self.digit_runs.findall(part):
+                    phone = self._as_phone(digits)
+                    if phone:
+                        phones[prefix + phone if prefix and part.startswith(digits) else phone] = None
+                # 4. IFSC
+                if len(part) >= 11:
+                    for code in self.ifsc.findall(part):
+                        ifsc_codes[code] = None
+            prefix = None
 
-        return intelligence
+    def extract(self, text: str) -> dict:
+        """
+        Scans text and returns unique extracted entities in a dictionary.
+        """
+        if not text or not isinstance(text, str):
+            return self._empty()
+
+        # Ordered sets: first occurrence wins, duplicates are dropped
+        upi_ids, links, phones, accounts, ifsc_codes = {}, {}, {}, {}, {}
+
+        found = (upi_ids, phones, accounts, ifsc_codes)
+        for match in self.scanner.finditer(text, 0, MAX_SCAN_CHARS):
+            url = match.group("url")
+            if url:
+                links[url] = None
+                body = match.start() + url.index("://") + 3
+                for inner in self.url_words.finditer(text, body, match.end()):
+                    self._classify(inner, found)
+            else:
+                self._classify(match, found)
+
+        return {
+            "upi_ids": list(upi_ids),
+            "phishing_links": list(links),
+            "phone_numbers": list(phones),
+            "bank_accounts": list(accounts),
+            "ifsc_codes": list(ifsc_codes)
+        }
+
+    def extract_many(self, texts: list) -> list:
+        """
+        Batch form of extract(); one result per input, in order.
+        """
+        return [self.extract(text) for text in texts]
 
 # Create the singleton instance
-extractor = IntelligenceExtractor()
\ No newline at end of file
+extractor = IntelligenceExtractor()
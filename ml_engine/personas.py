@@ -0,0 +1,146 @@
+import os
+import json
+import zlib
+from typing import Optional
+
+from ml_engine.backends import DATA_DIR
+
+PERSONAS_PATH = os.getenv("HONEYPOT_PERSONAS_PATH", os.path.join(DATA_DIR, "personas.json"))
+
+
+class PersonaState:
+    """
+    Where one sender is in the reply library: current persona, how many
+    personas they have been through, and how many lines of each intent the
+    current persona has already used on them.
+    """
+    __slots__ = ("persona", "tried", "offset", "turn", "used")
+
+    def __init__(self, persona: int, offset: int, intents: int):
+        self.persona = persona
+        self.tried = 1
+        # Per-sender starting point in every table, so senders don't all see the same sequence
+        self.offset = offset
+        self.turn = 0
+        self.used = [0] * intents
+
+    def to_list(self) -> list:
+        return [self.persona, self.tried, self.offset, self.turn, self.used]
+
+    @classmethod
+    def from_list(cls, data: list):
+        persona, tried, offset, turn, used = data
+        state = cls(persona, offset, len(used))
+        state.tried = tried
+        state.turn = turn
+        state.used = list(used)
+        return state
+
+
+class PersonaEngine:
+    """
+    Scripted reply libraries for several personas, indexed by intent.
+
+    Everything is resolved at load time: routes flatten into one tuple of
+    (keyword, intent indices) pairs in priority order, and each persona's
+    replies become a tuple of line tuples indexed by intent. Picking a reply
+    is then a few tuple lookups and counter bumps on the sender's PersonaState.
+
+    A sender never hears the same line twice from a persona; once a route's
+    intents are exhausted the next persona takes over. Lines only repeat
+    after every persona has been used up.
+    """
+
+    def __init__(self, config: dict):
+        self.intents = tuple(config["intents"])
+        index = {intent: i for i, intent in enumerate(self.intents)}
+        # Plain substring checks beat a regex alternation for a handful of short keywords
+        self.keywords = tuple(
+            (keyword.lower(), tuple(index[intent] for intent in route["intents"]))
+            for route in config.get("routes", [])
+            for keyword in route["keywords"]
+        )
+        # No keyword matched: draw from every intent
+        self.default_route = tuple(range(len(self.intents)))
+
+        self.names = []
+        self.prompts = []
+        self.libraries = []
+        for persona in config["personas"]:
+            replies = persona["replies"]
+            missing = [intent for intent in self.intents if not replies.get(intent)]
+            if missing:
+                raise ValueError(f"Persona {persona['name']!r} has no replies for {', '.join(missing)}")
+            self.names.append(persona["name"])
+            self.prompts.append(persona["system_prompt"])
+            self.libraries.append(tuple(tuple(replies[intent]) for intent in self.intents))
+        if not self.libraries:
+            raise ValueError("No personas configured")
+        self.names = tuple(self.names)
+        self.prompts = tuple(self.prompts)
+        self.libraries = tuple(self.libraries)
+        self.switches = 0
+        # Shared rotation for senders we can't tell apart
+        self._anonymous = self.new_state("")
+
+    @classmethod
+    def from_file(cls, path: str = PERSONAS_PATH):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def new_state(self, sender_id: Optional[str]) -> PersonaState:
+        # Stable across workers and restarts: the same sender starts with the same persona
+        seed = zlib.crc32((sender_id or "").encode("utf-8"))
+        return PersonaState(seed % len(self.libraries), seed >> 8, len(self.intents))
+
+    def route(self, message: str) -> tuple:
+        """
+        Intent indices for `message`: the first route with a keyword in it.
+        """
+        text = message.lower()
+        for keyword, intents in self.keywords:
+            if keyword in text:
+                return intents
+        return self.default_route
+
+    def reply(self, message: str, state: PersonaState = None) -> str:
+        state = state or self._anonymous
+        intents = self.route(message)
+        line = self._next_line(state, intents)
+        if line is None:
+            # This persona has nothing left for the route: the next one takes over
+            self._switch(state)
+            line = self._next_line(state, intents)
+        return line
+
+    def _next_line(self, state: PersonaState, intents: tuple):
+        library = self.libraries[state.persona]
+        # Alternate between the route's intents, skipping ones already used up
+        for _ in intents:
+            intent = intents[state.turn % len(intents)]
+            state.turn += 1
+            lines = library[intent]
+            used = state.used[intent]
+            if used < len(lines):
+                state.used[intent] = used + 1
+                return lines[(state.offset + used) % len(lines)]
+        return None
+
+    def _switch(self, state: PersonaState):
+        state.persona = (state.persona + 1) % len(self.libraries)
+        state.tried = min(state.tried + 1, len(self.libraries))
+        for i in range(len(state.used)):
+            state.used[i] = 0
+        self.switches += 1
+
+    def system_prompt(self, state: PersonaState = None) -> str:
+        return self.prompts[(state or self._anonymous).persona]
+
+    def name(self, state: PersonaState = None) -> str:
+        return self.names[(state or self._anonymous).persona]
+
+    def stats(self) -> dict:
+        return {"personas": list(self.names), "switches": self.switches}
+
+
+personas = PersonaEngine.from_file()
@@ -0,0 +1,125 @@
+import os
+import re
+import json
+
+from ml_engine.backends import DATA_DIR
+
+RULES_PATH = os.getenv("HONEYPOT_RULES_PATH", os.path.join(DATA_DIR, "rules.json"))
+
+
+def _trie_pattern(words) -> str:
+    """
+    Regex source for a character trie of `words`, so matching costs one walk
+    down the trie per position instead of one attempt per keyword. Optional
+    tails are greedy, so the longest keyword at a position wins.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class RuleEngine:
+    """
+    Keyword rules compiled into one matcher.
+
+    Each rule is {"pattern", "weight", "scam_type"?, "priority"?, "word"?}.
+    A rule counts once however often its keyword appears; the heuristic score
+    is the sum of matched weights, and the matched rule with the highest
+    priority (earliest in the file on ties) names the scam type.
+    Keywords match as substrings unless "word": true.
+    """
+
+    def __init__(self, config: dict):
+        self.model_weight = float(config.get("model_weight", 0.7))
+        self.heuristic_weight = float(config.get("heuristic_weight", 0.3))
+        self.threshold = float(config.get("threshold", 0.5))
+        self.default_scam_type = config.get("default_scam_type", "general_phishing")
+        self.rules = [
+            {
+                "pattern": rule["pattern"].lower(),
+                "weight": float(rule.get("weight", 0.0)),
+                "scam_type": rule.get("scam_type"),
+                "priority": int(rule.get("priority", 0)),
+                "word": bool(rule.get("word", False)),
+            }
+            for rule in config.get("rules", [])
+            if rule.get("pattern")
+        ]
+
+        # keyword -> rule indices; a match also credits keywords that are its prefix
+        self._by_keyword = {}
+        for i, rule in enumerate(self.rules):
+            self._by_keyword.setdefault(rule["pattern"], []).append(i)
+        self._prefixes = {
+            keyword: [keyword[:j] for j in range(1, len(keyword) + 1) if keyword[:j] in self._by_keyword]
+            for keyword in self._by_keyword
+        }
+        self._matcher = re.compile(_trie_pattern(self._by_keyword)) if self._by_keyword else None
+
+    @classmethod
+    def from_file(cls, path: str = RULES_PATH):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def match(self, message: str) -> list:
+        """
+        Indices of the rules matched by `message`, in file order.
+        """
+        if self._matcher is None:
+            return []
+        text = message.lower()
+        matched = set()
+        search = self._matcher.search
+        m = search(text)
+        while m is not None:
+            start = m.start()
+            for keyword in self._prefixes[m.group()]:
+                indices = self._by_keyword[keyword]
+                if matched.issuperset(indices):
+                    continue
+                end = start + len(keyword)
+                at_word = (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+                for i in indices:
+                    if at_word or not self.rules[i]["word"]:
+                        matched.add(i)
+            # Resume one character in, so keywords overlapping this one are found too
+            m = search(text, start + 1)
+        return sorted(matched)
+
+    def score(self, message: str, ml_prob: float) -> dict:
+        matched = self.match(message)
+        heuristic_score = 0
+        for i in matched:
+            heuristic_score += self.rules[i]["weight"]
+
+        final_score = min(1.0, (ml_prob * self.model_weight) + (heuristic_score * self.heuristic_weight))
+        is_scam = final_score > self.threshold
+
+        scam_type = "clean"
+        if is_scam:
+            scam_type = self.default_scam_type
+            best = None
+            for i in matched:
+                rule = self.rules[i]
+                if rule["scam_type"] and (best is None or rule["priority"] > best["priority"]):
+                    best = rule
+            if best is not None:
+                scam_type = best["scam_type"]
+
+        return {
+            "is_scam": bool(is_scam),
+            "confidence": float(round(final_score, 4)),
+            "scam_type": scam_type
+        }
@@ -0,0 +1,205 @@
+"""
+Retrains the detector from analyst feedback, in its own process so training
+never competes with the serving threads.
+
+    python -m ml_engine.trainer             # poll forever
+    python -m ml_engine.trainer --once      # single pass (cron)
+
+Backends that support it (hashing_linear) are updated incrementally with
+partial_fit on the labels added since the last run; the others are refit on
+the seed data plus all feedback. Every run publishes a new versioned artifact
+that serving workers hot-swap in (ScamDetector.reload_if_changed).
+"""
+import io
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+
+import joblib
+
+from ml_engine.backends import DATA_DIR, get_backend, load_labeled
+from ml_engine.detector import BACKEND_NAME, VERSIONS_DIR, publish_version, read_current
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# --- CONFIG ---
+FEEDBACK_PATH = os.getenv("HONEYPOT_FEEDBACK_PATH", os.path.join(DATA_DIR, "feedback.csv"))
+# New labels needed before a retrain is worth publishing
+RETRAIN_MIN_LABELS = int(os.getenv("HONEYPOT_RETRAIN_MIN_LABELS", "20"))
+RETRAIN_INTERVAL = float(os.getenv("HONEYPOT_RETRAIN_INTERVAL", "60"))
+# Versioned artifacts kept per backend (the current one is never pruned)
+MODEL_KEEP = int(os.getenv("HONEYPOT_MODEL_KEEP", "5"))
+
+_FIELDS = ["text", "label", "honeypot_id", "created_at"]
+
+
+def _lock(f, exclusive: bool):
+    if fcntl:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+
+def _unlock(f):
+    if fcntl:
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def record_feedback(text: str, label: int, honeypot_id: str = None):
+    """
+    Appends one analyst label. Safe across worker processes (flock).
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow([text, int(label), honeypot_id or "", round(time.time(), 3)])
+    with open(FEEDBACK_PATH, "a", newline="", encoding="utf-8") as f:
+        _lock(f, exclusive=True)
+        try:
+            # Size under the lock: tell() on a fresh append handle can predate another writer's header
+            if os.fstat(f.fileno()).st_size == 0:
+                f.write(",".join(_FIELDS) + "\r\n")
+            f.write(buffer.getvalue())
+        finally:
+            _unlock(f)
+
+
+def read_feedback(offset: int = 0):
+    """
+    Labels appended after byte `offset`. Returns (texts, labels, new_offset).
+    Rows that don't parse are logged and skipped; the offset still moves past
+    them, so one bad line can't stall every later retrain.
+    """
+    if not os.path.exists(FEEDBACK_PATH):
+        return [], [], 0
+    with open(FEEDBACK_PATH, "rb") as f:
+        _lock(f, exclusive=False)
+        try:
+            f.seek(offset)
+            data = f.read()
+        finally:
+            _unlock(f)
+    text = io.StringIO(data.decode("utf-8"), newline="")
+    reader = csv.DictReader(text) if offset == 0 else csv.DictReader(text, fieldnames=_FIELDS)
+    texts, labels = [], []
+    skipped = 0
+    for row in reader:
+        try:
+            label = int(row["label"])
+        except (TypeError, ValueError):
+            skipped += 1
+            continue
+        if row["text"] is None or label not in (0, 1):
+            skipped += 1
+            continue
+        texts.append(row["text"])
+        labels.append(label)
+    if skipped:
+        print(f"⚠️ Skipped {skipped} unparsable feedback row(s) after byte {offset}", file=sys.stderr)
+    return texts, labels, offset + len(data)
+
+
+# --- STATE ---
+def _state_path(backend_name: str) -> str:
+    return os.path.join(VERSIONS_DIR, f"{backend_name}.trainer.json")
+
+
+def _load_state(backend_name: str) -> dict:
+    try:
+        with open(_state_path(backend_name), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"offset": 0, "labels": 0}
+
+
+def _save_state(backend_name: str, state: dict):
+    tmp = _state_path(backend_name) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, _state_path(backend_name))
+
+
+def _prune(backend_name: str, keep_path: str):
+    directory = os.path.join(VERSIONS_DIR, backend_name)
+    versions = sorted(
+        (os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".pkl")),
+        key=os.path.getmtime,
+    )
+    for path in versions[:-MODEL_KEEP] if MODEL_KEEP > 0 else []:
+        if path != keep_path:
+            # Workers still mapping it keep their pages until they swap
+            os.remove(path)
+
+
+def train_once(backend_name: str = BACKEND_NAME, min_labels: int = RETRAIN_MIN_LABELS):
+    """
+    One retrain pass. Returns the published pointer, or None if there weren't
+    enough new labels.
+    """
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+    backend = get_backend(backend_name)
+    state = _load_state(backend_name)
+    texts, labels, offset = read_feedback(state["offset"])
+    if len(texts) < max(1, min_labels):
+        return None
+
+    started = time.monotonic()
+    current = read_current(backend_name)
+    if backend.incremental:
+        base_path = current["path"] if current else backend.artifact_path()
+        if os.path.exists(base_path):
+            # Not memory-mapped: partial_fit writes into the coefficients
+            model = backend.update(joblib.load(base_path), texts, labels)
+        else:
+            seed_texts, seed_labels = load_labeled()
+            model = backend.train(seed_texts + texts, seed_labels + labels)
+        mode = "partial_fit"
+    else:
+        seed_texts, seed_labels = load_labeled()
+        all_texts, all_labels, _ = read_feedback(0)
+        model = backend.train(seed_texts + all_texts, seed_labels + all_labels)
+        mode = "refit"
+
+    state = {"offset": offset, "labels": state["labels"] + len(texts)}
+    pointer = publish_version(
+        model, backend_name, mode=mode, labels=state["labels"], parent=current["version"] if current else "baseline"
+    )
+    _save_state(backend_name, state)
+    _prune(backend_name, pointer["path"])
+    print(
+        f"🧠 Published {backend_name} {pointer['version']} ({mode}, +{len(texts)} labels, "
+        f"{time.monotonic() - started:.2f}s)",
+        file=sys.stderr,
+    )
+    return pointer
+
+
+def run_forever(backend_name: str = BACKEND_NAME, interval: float = RETRAIN_INTERVAL, min_labels: int = RETRAIN_MIN_LABELS):
+    if hasattr(os, "nice"):
+        # Background priority: serving processes win any CPU contention
+        os.nice(10)
+    while True:
+        try:
+            train_once(backend_name, min_labels)
+        except Exception as e:
+            print(f"⚠️ Retrain failed: {type(e).__name__}: {e}", file=sys.stderr)
+        time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Retrain the scam detector from analyst feedback")
+    parser.add_argument("--backend", default=BACKEND_NAME, help="detector backend")
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    parser.add_argument("--min-labels", type=int, default=RETRAIN_MIN_LABELS, help="new labels needed to retrain")
+    parser.add_argument("--interval", type=float, default=RETRAIN_INTERVAL, help="seconds between passes")
+    args = parser.parse_args(argv)
+    if args.once:
+        pointer = train_once(args.backend, args.min_labels)
+        print(json.dumps(pointer) if pointer else "No new labels to train on")
+    else:
+        run_forever(args.backend, args.interval, args.min_labels)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,67 @@
-from sqlalchemy import Column, String, Boolean, Float, Integer, JSON, DateTime
+from sqlalchemy import Column, String, Boolean, Float, Integer, JSON, DateTime, Index, UniqueConstraint
 from database import Base
 import datetime
+import os
+
+# Range-partition honeypot_runs by month (PostgreSQL, new databases only).
+# Partition keys must be part of the primary key, hence (id, timestamp).
+PARTITION_RUNS = os.getenv("HONEYPOT_PARTITION_RUNS", "0") == "1"
 
 class HoneypotRun(Base):
     __tablename__ = "honeypot_runs"
+    __table_args__ = (
+        # Dashboard time-range queries, optionally narrowed by verdict / type
+        Index("ix_honeypot_runs_ts_scam_type", "timestamp", "is_scam", "scam_type"),
+        {"postgresql_partition_by": "RANGE (timestamp)"} if PARTITION_RUNS else {},
+    )
 
     id = Column(String, primary_key=True, index=True)
-    timestamp = Column(DateTime, default=datetime.datetime.utcnow)
+    timestamp = Column(DateTime, primary_key=PARTITION_RUNS, default=datetime.datetime.utcnow)
     input_message = Column(String)
     
     # Classification
     is_scam = Column(Boolean)
     scam_type = Column(String)
     confidence = Column(Float)
+    campaign_id = Column(String, index=True)
     
     # Intelligence
     extracted_upi = Column(JSON)
     extracted_links = Column(JSON)
     extracted_accounts = Column(JSON)
+    extracted_phones = Column(JSON)
     
     # Engagement
     messages_exchanged = Column(Integer)
     duration_seconds = Column(Integer)
-    
\ No newline at end of file
+
+
+class RunIndicator(Base):
+    """
+    One row per (indicator, run): the normalized form of the JSON intel
+    columns, for "which runs mentioned this UPI/phone/host" lookups.
+    """
+    __tablename__ = "honeypot_run_indicators"
+    __table_args__ = (
+        UniqueConstraint("kind", "value", "run_id", name="uq_honeypot_run_indicators"),
+        Index("ix_honeypot_run_indicators_lookup", "kind", "value", "timestamp", "run_id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)
+    value = Column(String, nullable=False)
+    run_id = Column(String, nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+
+
+class RunRollup(Base):
+    """
+    Hourly run counts per verdict, maintained by the write-behind flusher.
+    """
+    __tablename__ = "honeypot_run_rollups"
+
+    bucket = Column(DateTime, primary_key=True)
+    is_scam = Column(Boolean, primary_key=True)
+    scam_type = Column(String, primary_key=True)
+    runs = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import queue
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+from sqlalchemy.exc import IntegrityError
+
+from analytics import ensure_partitions, insert_runs, write_derived
+from database import Base, SessionLocal, engine
+from models import HoneypotRun
+
+# --- WRITE-BEHIND TUNING ---
+PERSIST_ENABLED = os.getenv("HONEYPOT_PERSIST", "1") == "1"
+WRITE_BUFFER_SIZE = int(os.getenv("HONEYPOT_WRITE_BUFFER", "10000"))
+FLUSH_BATCH_SIZE = int(os.getenv("HONEYPOT_FLUSH_BATCH", "500"))
+FLUSH_INTERVAL = float(os.getenv("HONEYPOT_FLUSH_INTERVAL", "1.0"))
+FLUSH_RETRIES = int(os.getenv("HONEYPOT_FLUSH_RETRIES", "3"))
+RETRY_BACKOFF = float(os.getenv("HONEYPOT_RETRY_BACKOFF", "0.5"))
+# "spill" appends overflow to SPILL_PATH as JSONL; "drop" just counts it
+OVERFLOW_POLICY = os.getenv("HONEYPOT_WRITE_OVERFLOW", "spill")
+SPILL_PATH = os.getenv("HONEYPOT_SPILL_PATH", "honeypot_spill.jsonl")
+
+
+def run_row(response) -> dict:
+    """
+    Flattens a HoneypotResponse into a honeypot_runs row.
+    """
+    timestamp = datetime.fromisoformat(response.timestamp_utc)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return {
+        "id": response.honeypot_id,
+        "timestamp": timestamp,
+        "input_message": response.input_message,
+        "is_scam": response.classification.is_scam,
+        "scam_type": response.classification.scam_type,
+        "confidence": response.classification.confidence,
+        "campaign_id": response.campaign_id,
+        "extracted_upi": response.intelligence.upi_ids,
+        "extracted_links": response.intelligence.phishing_links,
+        "extracted_accounts": response.intelligence.bank_accounts,
+        "extracted_phones": response.intelligence.phone_numbers,
+        "messages_exchanged": response.engagement.messages_exchanged,
+        "duration_seconds": response.engagement.duration_seconds,
+    }
+
+
+class RunWriter:
+    """
+    In-process write-behind queue for HoneypotRun rows.
+
+    submit() never touches the database: rows go into a bounded buffer and a
+    background thread flushes them as multi-row INSERTs once FLUSH_BATCH_SIZE
+    rows are waiting or FLUSH_INTERVAL seconds have passed. Rows that don't
+    fit in the buffer are handed to the same thread to spill, so submit()
+    never does file I/O either.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=WRITE_BUFFER_SIZE)
+        # Buffer overflow waiting for the writer thread to spill it
+        self._overflow = deque()
+        self._stop = threading.Event()
+        self._thread = None
+        self._spill_lock = threading.Lock()
+        self._schema_ready = False
+        self.enqueued = 0
+        self.written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.spilled = 0
+        self.dropped = 0
+        self.duplicates = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="honeypot-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, row: dict):
+        try:
+            self._queue.put_nowait(row)
+            self.enqueued += 1
+        except queue.Full:
+            # Called on the event loop: no file I/O here, and the overflow is bounded too
+            if OVERFLOW_POLICY != "spill" or len(self._overflow) >= WRITE_BUFFER_SIZE:
+                self.dropped += 1
+            else:
+                self._overflow.append(row)
+
+    def _run(self):
+        while not self._stop.is_set() or not self._queue.empty() or self._overflow:
+            self._spill_overflow()
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+
+    def _spill_overflow(self):
+        rows = []
+        while self._overflow:
+            rows.append(self._overflow.popleft())
+        if rows:
+            self._shed(rows)
+
+    def _collect(self) -> list:
+        batch = []
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        while len(batch) < FLUSH_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+            if self._stop.is_set():
+                # Shutting down: drain whatever is already buffered without waiting
+                while len(batch) < FLUSH_BATCH_SIZE:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                break
+        return batch
+
+    def _flush(self, rows: list):
+        for attempt in range(FLUSH_RETRIES + 1):
+            try:
+                if not self._schema_ready:
+                    Base.metadata.create_all(bind=engine)
+                    self._schema_ready = True
+                ensure_partitions(engine)
+                with SessionLocal() as db:
+                    # Multi-row INSERT ... ON CONFLICT DO NOTHING; a duplicate id is skipped, not fatal
+                    inserted = insert_runs(db, rows)
+                    # Indicator index + rollups commit atomically with the runs
+                    write_derived(db, inserted)
+                    db.commit()
+                self.written += len(inserted)
+                self.flushes += 1
+                if len(inserted) < len(rows):
+                    self._set_aside_duplicates(rows, inserted)
+                return
+            except IntegrityError as e:
+                # The same rows would fail again: no retry
+                print(f"⚠️ DB flush rejected: {type(e).__name__}: {e}")
+                break
+            except Exception as e:
+                print(f"⚠️ DB flush failed (attempt {attempt + 1}/{FLUSH_RETRIES + 1}): {type(e).__name__}: {e}")
+                if attempt < FLUSH_RETRIES and not self._stop.is_set():
+                    time.sleep(RETRY_BACKOFF * (2 ** attempt))
+        self.failed_flushes += 1
+        self._shed(rows)
+
+    def _set_aside_duplicates(self, rows: list, inserted: list):
+        kept = {id(row) for row in inserted}
+        duplicates = [row for row in rows if id(row) not in kept]
+        self.duplicates += len(duplicates)
+        print(f"⚠️ {len(duplicates)} run(s) skipped: id already stored")
+        self._shed(duplicates)
+
+    def _shed(self, rows: list):
+        if OVERFLOW_POLICY != "spill":
+            self.dropped += len(rows)
+            return
+        try:
+            with self._spill_lock, open(SPILL_PATH, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, default=str) + "\n")
+            self.spilled += len(rows)
+        except OSError as e:
+            print(f"⚠️ Spill failed: {e}")
+            self.dropped += len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": PERSIST_ENABLED,
+            "buffered": self._queue.qsize(),
+            "overflow": len(self._overflow),
+            "buffer_size": WRITE_BUFFER_SIZE,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "spilled": self.spilled,
+            "dropped": self.dropped,
+            "duplicates": self.duplicates,
+        }
+
+
+run_writer = RunWriter()
@@ -1,6 +1,14 @@
 from pydantic import BaseModel, Field, model_validator
 from typing import List, Optional, Dict, Any
 
+# Keys that usually carry the message text, best first
+_TEXT_KEY_RANK = {
+    key: rank for rank, key in enumerate(
+        ['message', 'text', 'content', 'input', 'prompt', 'query', 'msg', 'body', 'payload']
+    )
+}
+_FALLBACK_RANK = len(_TEXT_KEY_RANK)
+
 # --- INPUT SCHEMA (OMNIVOROUS) ---
 class MessageInput(BaseModel):
     message: Optional[str] = ""
@@ -22,19 +30,17 @@ class MessageInput(BaseModel):
         
         # Handle dictionary case
         if isinstance(data, dict):
-            # First, check ALL string values (not just >5 chars)
+            # Single pass: the best-ranked known text key wins; any other
+            # non-empty string is the fallback (first one in key order)
             found_text = None
-            for key in ['message', 'text', 'content', 'input', 'prompt', 'query', 'msg', 'body', 'payload']:
-                if key in data and isinstance(data[key], str) and data[key].strip():
-                    found_text = data[key]
-                    break
-            
-            # If still not found, look for ANY string value
-            if not found_text:
-                for key, value in data.items():
-                    if isinstance(value, str) and value.strip():
-                        found_text = value
-                        break
+            found_rank = _FALLBACK_RANK
+            for key, value in data.items():
+                if isinstance(value, str) and value.strip():
+                    rank = _TEXT_KEY_RANK.get(key, _FALLBACK_RANK)
+                    if rank < found_rank or found_text is None:
+                        found_text, found_rank = value, rank
+                        if rank == 0:
+                            break
             
             # Assign to message field
             if found_text:
@@ -48,6 +54,11 @@ class MessageInput(BaseModel):
             
         return data
 
+class FeedbackInput(BaseModel):
+    message: str
+    is_scam: bool
+    honeypot_id: Optional[str] = None
+
 # --- OUTPUT SCHEMAS ---
 class ScamClassification(BaseModel):
     is_scam: bool
@@ -73,4 +84,5 @@ class HoneypotResponse(BaseModel):
     classification: ScamClassification
     intelligence: IntelligenceData
     engagement: EngagementMetrics
+    campaign_id: Optional[str] = None
     metadata: Dict[str, Any] = Field(default_factory=dict)
\ No newline at end of file
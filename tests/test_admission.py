@@ -0,0 +1,78 @@
+"""
+Token-bucket cost accounting: a request larger than the burst is admitted
+but charged in full, so batch size can't be used to beat the per-key rate.
+Also the CPU-pool job counter behind the cpu_queue watchdog.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import admission
+from admission import TokenBucketLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission, "time", clock)
+    return clock
+
+
+def test_oversized_request_admitted_on_full_bucket_then_repaid(clock):
+    limiter = TokenBucketLimiter(rate=200, burst=400)
+    assert limiter.allow("k", 20000)
+    # 19,600 tokens of debt at 200/s
+    clock.now += 97.9
+    assert not limiter.allow("k")
+    clock.now += 0.2
+    assert limiter.allow("k")
+
+
+def test_oversized_request_needs_a_full_bucket(clock):
+    limiter = TokenBucketLimiter(rate=200, burst=400)
+    assert limiter.allow("k", 10)
+    assert not limiter.allow("k", 1000)
+
+
+def test_batches_cannot_exceed_the_rate(clock):
+    limiter = TokenBucketLimiter(rate=200, burst=400)
+    admitted = 0
+    for _ in range(30):
+        if limiter.allow("k", 1000):
+            admitted += 1000
+        clock.now += 0.1
+    # burst + 3 s of refill, plus the one batch that may run into debt
+    assert admitted <= 400 + 200 * 3 + 1000
+
+
+def test_reserve_charges_full_cost(clock):
+    limiter = TokenBucketLimiter(rate=200, burst=400)
+    assert limiter.reserve("k", 400) == 0.0
+    assert limiter.reserve("k", 2000) == pytest.approx(10.0)
+    assert limiter.reserve("k", 1) == pytest.approx(10.005)
+
+
+def test_cpu_jobs_counted_until_done():
+    controller = admission.AdmissionController()
+    pool = ThreadPoolExecutor(max_workers=1)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        job = loop.run_in_executor(pool, lambda: None)
+        controller.cpu_submitted(job)
+        assert controller.cpu_jobs == 1
+        await job
+        await asyncio.sleep(0)
+        assert controller.cpu_jobs == 0
+
+    asyncio.run(main())
+    pool.shutdown()
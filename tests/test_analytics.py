@@ -0,0 +1,41 @@
+"""
+summary() counts whole hourly rollup buckets and reports the window it
+actually covered.
+"""
+import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from analytics import summary
+from database import Base
+from models import RunRollup
+
+
+def hour(h: int) -> datetime.datetime:
+    return datetime.datetime(2026, 1, 1, h, 0)
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'runs.db'}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        for h, runs in ((8, 1), (9, 2), (10, 4), (11, 8)):
+            session.add(RunRollup(bucket=hour(h), is_scam=True, scam_type="kyc_phishing", runs=runs, confidence_sum=0.9 * runs))
+        session.commit()
+        yield session
+
+
+def test_unaligned_window_is_widened_to_whole_hours(db):
+    result = summary(db, since=hour(9).replace(minute=30), until=hour(10).replace(minute=30))
+    assert result["since"] == hour(9).isoformat()
+    assert result["until"] == hour(11).isoformat()
+    assert result["total_runs"] == 2 + 4
+
+
+def test_aligned_until_is_exclusive(db):
+    result = summary(db, since=hour(9), until=hour(11), hourly=True)
+    assert result["until"] == hour(11).isoformat()
+    assert [row["runs"] for row in result["hourly_scam_runs"]] == [2, 4]
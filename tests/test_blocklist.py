@@ -0,0 +1,61 @@
+"""
+IndicatorIndex DB seeding: only trusted runs count, and rows committed out
+of id order (several workers' writers) are still picked up.
+"""
+import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import database
+from database import Base
+from ml_engine.blocklist import IndicatorIndex
+from models import HoneypotRun, RunIndicator
+
+TS = datetime.datetime(2026, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'runs.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(database, "SessionLocal", factory)
+    return factory
+
+
+def store(session, indicator_id: int, upi: str, confidence: float = 0.95, scam_type: str = "kyc_phishing"):
+    run_id = f"hp_{indicator_id}"
+    with session() as db:
+        db.add(HoneypotRun(id=run_id, timestamp=TS, is_scam=True, scam_type=scam_type, confidence=confidence))
+        db.add(RunIndicator(id=indicator_id, kind="upi", value=upi, run_id=run_id, timestamp=TS))
+        db.commit()
+
+
+def test_late_commit_below_cursor_is_loaded(session):
+    index = IndicatorIndex(path="", from_db=True)
+    store(session, 10, "first@ybl")
+    index.reload()
+    assert index._snapshot.contains("upi", "first@ybl")
+
+    # Another worker's transaction with a lower id commits after the cursor moved past it
+    store(session, 12, "second@ybl")
+    index.refresh_db()
+    store(session, 11, "late@ybl")
+    index.refresh_db()
+
+    assert index._snapshot.contains("upi", "second@ybl")
+    assert index._snapshot.contains("upi", "late@ybl")
+    assert index.size == 3
+
+
+def test_untrusted_runs_are_not_seeded(session):
+    index = IndicatorIndex(path="", from_db=True)
+    store(session, 1, "weak@ybl", confidence=0.6)
+    store(session, 2, "echo@ybl", scam_type="known_bad_indicator")
+    store(session, 3, "strong@ybl")
+    index.reload()
+    assert not index._snapshot.contains("upi", "weak@ybl")
+    assert not index._snapshot.contains("upi", "echo@ybl")
+    assert index._snapshot.contains("upi", "strong@ybl")
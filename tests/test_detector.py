@@ -0,0 +1,36 @@
+"""
+A model that can't be loaded fails the request and is reported, instead of
+every message scoring ml_prob=0.0.
+"""
+import pytest
+
+from ml_engine.detector import ScamDetector
+
+
+@pytest.fixture
+def corrupt_model(tmp_path):
+    path = tmp_path / "scam_model.pkl"
+    path.write_bytes(b"not a pickle")
+    return str(path)
+
+
+def test_load_failure_fails_predict(corrupt_model):
+    detector = ScamDetector(model_path=corrupt_model)
+    with pytest.raises(Exception):
+        detector.predict("URGENT: verify your KYC now")
+    with pytest.raises(Exception):
+        detector.predict_batch(["URGENT: verify your KYC now"])
+    assert detector.load_error
+    assert not detector.is_loaded
+    assert detector.cache.stats()["size"] == 0
+
+
+def test_successful_load_clears_error(corrupt_model, tmp_path):
+    detector = ScamDetector(model_path=corrupt_model)
+    with pytest.raises(Exception):
+        detector.load()
+    # No artifact at the new path: trains and writes a baseline there
+    detector.model_path = str(tmp_path / "fresh.pkl")
+    detector.load()
+    assert detector.load_error is None
+    assert detector.is_loaded
@@ -0,0 +1,73 @@
+"""
+Differential test: the single-pass scanner against the original per-entity
+regexes (still kept in IntelligenceExtractor.patterns).
+
+Known, intentional difference: a phone number must be a whole digit run
+(optionally with a trunk 0 or 91 in front). The old pattern read the first
+ten digits starting 6-9 out of any longer run, e.g. a phone "6029213494"
+inside the account number 460292134948.
+"""
+import re
+
+import pytest
+
+from benchmarks.corpus import generate_corpus
+from ml_engine.extractor import extractor
+
+P = extractor.patterns
+EXACT_FIELDS = ("upi_ids", "phishing_links", "bank_accounts", "ifsc_codes")
+
+CASES = [
+    "Verify now.https://bad.in/kyc",
+    "Pay here-https://bad.in",
+    "https://user@bad.in",
+    "https://x.in/p?ph=9876543210&a=123456789012",
+    "+919876543210",
+    "919876543210",
+    "09876543210",
+    "abc9876543210",
+    "id_9876543210 and abc_123456789",
+    "+919876543210@ybl",
+    "pay 9876543210@paytm or ramesh.k@okicici",
+    "call +91 9876543210 or +91-8765432109",
+    "IFSC SBIN0001234 acct 123456789012, ref XSBIN0001234Y",
+]
+
+
+def baseline(text: str) -> dict:
+    return {
+        "upi_ids": set(re.findall(P["upi_id"], text)),
+        "phishing_links": set(re.findall(P["url"], text)),
+        "phone_numbers": set(re.findall(P["phone_number"], text)),
+        "bank_accounts": {n for n in re.findall(P["bank_account"], text) if len(n) != 10},
+        "ifsc_codes": set(re.findall(P["ifsc"], text)),
+    }
+
+
+def _inside_longer_run(text: str, phone: str) -> bool:
+    digits = phone[-10:]
+    return all(len(run) > 10 and digits in run for run in re.findall(r"\d+", text) if digits in run)
+
+
+@pytest.mark.parametrize("text", CASES + [row["text"] for row in generate_corpus(2000)])
+def test_matches_original_patterns(text):
+    old = baseline(text)
+    new = {field: set(values) for field, values in extractor.extract(text).items()}
+    for field in EXACT_FIELDS:
+        assert new[field] == old[field], field
+    # Phones: identical except old hits carved out of longer digit runs
+    assert {p for p in old["phone_numbers"] if not _inside_longer_run(text, p)} <= new["phone_numbers"]
+
+
+@pytest.mark.parametrize("text, phone", [
+    ("919876543210", "9876543210"),
+    ("09876543210", "9876543210"),
+    ("abc9876543210", "9876543210"),
+    ("+919876543210@ybl", "+919876543210"),
+])
+def test_phone_normalization(text, phone):
+    assert phone in extractor.extract(text)["phone_numbers"]
+
+
+def test_no_phone_inside_account_number():
+    assert extractor.extract("a/c 460292134948")["phone_numbers"] == []
@@ -0,0 +1,65 @@
+"""
+Multiprocess metrics: a scrape merges every worker's <pid>.json file.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = metrics.Registry(str(tmp_path))
+
+    def make(cls, *args, **kwargs):
+        metric = cls(*args, **kwargs)
+        # Constructors register with the global registry; move it over
+        metrics.REGISTRY._metrics.remove(metric)
+        registry.register(metric)
+        return metric
+
+    registry.make = make
+    return registry
+
+
+def exited_pid() -> int:
+    child = subprocess.Popen([sys.executable, "-c", "pass"])
+    child.wait()
+    return child.pid
+
+
+def write_worker(directory: str, pid: int, payload: dict):
+    with open(os.path.join(directory, f"{pid}.json"), "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+
+
+def test_counters_and_histograms_sum_across_workers(registry):
+    counter = registry.make(metrics.Counter, "t_requests_total", "Requests.", ["route"])
+    histogram = registry.make(metrics.Histogram, "t_latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    counter.labels("engage").inc(3)
+    histogram.observe(0.05)
+    # An exited worker's totals still count, so counters never go backwards
+    write_worker(registry.directory, exited_pid(), {
+        "t_requests_total": [[["engage"], 2.0], [["batch"], 5.0]],
+        "t_latency_seconds": [[[], [[0, 1, 1], 2.5]]],
+    })
+
+    merged = registry._merge(registry._write())
+    assert merged["t_requests_total"] == {("engage",): 5.0, ("batch",): 5.0}
+    assert merged["t_latency_seconds"] == {(): ([1, 1, 1], pytest.approx(2.55))}
+    text = registry.render()
+    assert 't_requests_total{route="engage"} 5.0' in text
+    assert 't_latency_seconds_count 3' in text
+
+
+def test_gauges_are_per_live_pid(registry):
+    gauge = registry.make(metrics.Gauge, "t_inflight", "In flight.")
+    gauge.set(4)
+    write_worker(registry.directory, exited_pid(), {"t_inflight": [[[], 9.0]]})
+
+    merged = registry._merge(registry._write())
+    assert merged["t_inflight"] == {(str(os.getpid()),): 4.0}
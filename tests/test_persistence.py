@@ -0,0 +1,73 @@
+"""
+RunWriter: a duplicate id sets aside only that row, and buffer overflow is
+spilled by the writer thread rather than inside submit().
+"""
+import datetime
+import json
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+import persistence
+from models import HoneypotRun
+
+
+def row(run_id: str) -> dict:
+    return {
+        "id": run_id,
+        "timestamp": datetime.datetime(2026, 1, 1, 12, 0),
+        "input_message": "pay now",
+        "is_scam": True,
+        "scam_type": "general_phishing",
+        "confidence": 0.9,
+        "campaign_id": None,
+        "extracted_upi": ["x@ybl"],
+        "extracted_links": [],
+        "extracted_accounts": [],
+        "extracted_phones": [],
+        "messages_exchanged": 1,
+        "duration_seconds": 0,
+    }
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'runs.db'}")
+    monkeypatch.setattr(persistence, "engine", engine)
+    monkeypatch.setattr(persistence, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(persistence, "SPILL_PATH", str(tmp_path / "spill.jsonl"))
+    monkeypatch.setattr(persistence, "RETRY_BACKOFF", 0.0)
+    return engine
+
+
+def stored(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(HoneypotRun)).scalar()
+
+
+def test_duplicate_id_sets_aside_only_that_row(db):
+    writer = persistence.RunWriter()
+    writer._flush([row("hp_dup")])
+    writer._flush([row(f"hp_{i}") for i in range(300)] + [row("hp_dup"), row("hp_0")])
+    assert stored(db) == 301
+    assert writer.written == 301
+    assert writer.duplicates == 2
+    assert writer.failed_flushes == 0
+    with open(persistence.SPILL_PATH) as f:
+        assert sorted(json.loads(line)["id"] for line in f) == ["hp_0", "hp_dup"]
+
+
+def test_overflow_is_spilled_off_the_submitting_thread(db, monkeypatch):
+    monkeypatch.setattr(persistence, "OVERFLOW_POLICY", "spill")
+    writer = persistence.RunWriter()
+    writer._queue.maxsize = 2
+    writer._shed = lambda rows: pytest.fail("submit() must not spill")
+    for i in range(5):
+        writer.submit(row(f"hp_{i}"))
+    assert writer.stats()["overflow"] == 3
+    del writer._shed
+    writer.start()
+    writer.stop()
+    assert stored(db) == 2
+    assert writer.spilled == 3
@@ -0,0 +1,51 @@
+"""
+Feedback log: one header however writers race, and bad rows are skipped
+without stalling the offset.
+"""
+import pytest
+
+from ml_engine import trainer
+
+
+@pytest.fixture
+def feedback_path(tmp_path, monkeypatch):
+    path = tmp_path / "feedback.csv"
+    monkeypatch.setattr(trainer, "FEEDBACK_PATH", str(path))
+    return path
+
+
+def test_single_header_when_another_writer_wins_the_race(feedback_path, monkeypatch):
+    real_lock = trainer._lock
+    raced = []
+
+    def racing_lock(f, exclusive):
+        # Our append handle is already open on an empty file; another process
+        # writes the header and its row before we get the lock
+        if not raced:
+            raced.append(True)
+            trainer.record_feedback("other writer", 0)
+        real_lock(f, exclusive)
+
+    monkeypatch.setattr(trainer, "_lock", racing_lock)
+    trainer.record_feedback("pay the fee now", 1)
+    lines = feedback_path.read_text(encoding="utf-8").splitlines()
+    assert lines.count(",".join(trainer._FIELDS)) == 1
+    texts, labels, _ = trainer.read_feedback(0)
+    assert (texts, labels) == (["other writer", "pay the fee now"], [0, 1])
+
+
+def test_unparsable_rows_are_skipped_and_offset_advances(feedback_path):
+    trainer.record_feedback("first", 1)
+    _, _, offset = trainer.read_feedback(0)
+    with open(feedback_path, "a", encoding="utf-8", newline="") as f:
+        f.write(",".join(trainer._FIELDS) + "\r\n")
+        f.write("garbled,yes,,\r\n")
+        f.write("bad label,7,,\r\n")
+    trainer.record_feedback("second", 0)
+
+    texts, labels, new_offset = trainer.read_feedback(offset)
+    assert (texts, labels) == (["second"], [0])
+    assert new_offset == feedback_path.stat().st_size
+    assert trainer.read_feedback(new_offset)[:2] == ([], [])
+    texts, labels, _ = trainer.read_feedback(0)
+    assert (texts, labels) == (["first", "second"], [1, 0])
@@ -0,0 +1,69 @@
+"""
+Verdicts must not depend on which message of a cache key arrived first.
+"""
+import threading
+
+import numpy as np
+import pytest
+
+from ml_engine.detector import ScamDetector
+
+TEMPLATE = "Dear customer, your account {amount} will be suspended. Update at https://{host}/login"
+SHADY = TEMPLATE.format(amount="4821", host="kyc-verify-urgent-blocked.in")
+PLAIN = TEMPLATE.format(amount="4821", host="example.in")
+
+
+class KeywordModel:
+    """
+    Stand-in classifier whose score depends on the host, like a real one can.
+    """
+    def predict_proba(self, texts):
+        return np.array([[0.0, 0.9] if "kyc" in text else [0.6, 0.4] for text in texts])
+
+
+def fresh_detector():
+    detector = ScamDetector()
+    detector.model = KeywordModel()
+    return detector
+
+
+def test_links_are_scored_not_masked():
+    detector = fresh_detector()
+    assert detector.predict(SHADY) != detector.predict(PLAIN)
+
+
+@pytest.mark.parametrize("order", [(SHADY, PLAIN), (PLAIN, SHADY)])
+def test_verdict_independent_of_arrival_order(order):
+    expected = {message: fresh_detector().predict(message) for message in (SHADY, PLAIN)}
+    detector = fresh_detector()
+    for message in order:
+        assert detector.predict(message) == expected[message]
+    batch_detector = fresh_detector()
+    assert batch_detector.predict_batch(list(order)) == [expected[message] for message in order]
+
+
+def test_digit_variants_share_an_entry():
+    detector = fresh_detector()
+    first = detector.predict(SHADY)
+    assert detector.predict(SHADY.replace("4821", "9977")) == first
+    assert detector.cache.stats()["hits"] == 1
+
+
+def test_swap_mid_prediction_does_not_cache_stale_verdict():
+    detector = fresh_detector()
+    started, go = threading.Event(), threading.Event()
+
+    class Slow(KeywordModel):
+        def predict_proba(self, texts):
+            started.set()
+            go.wait()
+            return super().predict_proba(texts)
+
+    detector.model = Slow()
+    worker = threading.Thread(target=detector.predict, args=(SHADY,))
+    worker.start()
+    started.wait()
+    detector.swap(KeywordModel(), "next")
+    go.set()
+    worker.join()
+    assert detector.cache.stats()["size"] == 0